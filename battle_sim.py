@@ -0,0 +1,139 @@
+"""Monte Carlo battle simulator for balancing enemies and spells
+
+Runs many independent battles at once as NumPy arrays, using the same rules
+as wizardry_engine.GameState, and reports per (enemy, level, strategy):
+win rate, turns to kill, HP lost and EXP/gold earned per turn.
+
+Run with: python battle_sim.py --battles 100000 --levels 1 2 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from wizardry_engine import (
+    enemies, spells, new_player,
+    ATTACK_MIN_DAMAGE, ATTACK_MAX_DAMAGE, ATTACK_LEVEL_BONUS, LEVEL_HP_GAIN, LEVEL_MP_GAIN
+)
+
+# How the player picks an action each turn
+STRATEGIES = ("attack", "best_spell", "cheapest_spell")
+
+# Battles still running after this many turns count as losses
+MAX_TURNS = 200
+
+
+def player_stats(level):
+    """Full max HP and MP of a player who has leveled up to level"""
+    player = new_player()
+    return (
+        player["max_hp"] + LEVEL_HP_GAIN * (level - 1),
+        player["max_mp"] + LEVEL_MP_GAIN * (level - 1)
+    )
+
+
+def choose_spells(strategy, level, mp):
+    """Index of the spell each battle casts this turn, or -1 to attack"""
+    choice = np.full(mp.shape, -1)
+    if strategy == "attack":
+        return choice
+    usable = [i for i, spell in enumerate(spells) if level >= spell["level_req"]]
+    if strategy == "best_spell":
+        usable.reverse()  # Later spells hit harder; try them first
+    for i in reversed(usable):
+        # Walk from least to most preferred so the preferred one wins
+        choice = np.where(mp >= spells[i]["mp_cost"], i, choice)
+    return choice
+
+
+def simulate_battles(enemy, level, strategy, battles, rng):
+    """Fight the same enemy battles times in parallel and return the outcome arrays"""
+    max_hp, max_mp = player_stats(level)
+    enemy_hp = np.full(battles, enemy["hp"])
+    player_hp = np.full(battles, max_hp)
+    mp = np.full(battles, max_mp)
+    turns = np.zeros(battles, dtype=np.int32)
+    won = np.zeros(battles, dtype=bool)
+    active = np.arange(battles)
+
+    for _ in range(MAX_TURNS):
+        if not active.size:
+            break
+        count = active.size
+        turns[active] += 1
+
+        # Player's turn: physical attack or a spell
+        spell = choose_spells(strategy, level, mp[active])
+        damage = rng.integers(ATTACK_MIN_DAMAGE, ATTACK_MAX_DAMAGE + 1, count) + level * ATTACK_LEVEL_BONUS
+        for i, data in enumerate(spells):
+            casting = spell == i
+            if casting.any():
+                rolls = rng.integers(data["min_damage"], data["max_damage"] + 1, count) + level
+                damage = np.where(casting, rolls, damage)
+                mp[active[casting]] -= data["mp_cost"]
+        enemy_hp[active] -= damage
+
+        killed = enemy_hp[active] <= 0
+        won[active[killed]] = True
+        active = active[~killed]
+
+        # Enemy's turn
+        player_hp[active] -= rng.integers(1, enemy["attack"] + 1, active.size)
+        active = active[player_hp[active] > 0]
+
+    return won, turns, max_hp - np.maximum(player_hp, 0)
+
+
+def summarize(enemy, level, strategy, won, turns, hp_lost):
+    """Aggregate one batch of battles into a result row"""
+    total_turns = turns.sum()
+    wins = won.sum()
+    return {
+        "enemy": enemy["name"],
+        "level": level,
+        "strategy": strategy,
+        "battles": len(won),
+        "win_rate": wins / len(won),
+        "turns_to_kill": turns[won].mean() if wins else float("nan"),
+        "hp_lost": hp_lost.mean(),
+        "exp_per_turn": wins * enemy["exp"] / total_turns,
+        "gold_per_turn": wins * enemy["gold"] / total_turns
+    }
+
+
+def run(levels, strategies, battles, seed=None):
+    """Simulate every enemy against every level and strategy"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for enemy in enemies:
+        for level in levels:
+            for strategy in strategies:
+                outcome = simulate_battles(enemy, level, strategy, battles, rng)
+                results.append(summarize(enemy, level, strategy, *outcome))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--battles", type=int, default=10000, help="battles per enemy/level/strategy")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run(args.levels, args.strategies, args.battles, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'enemy':<10} {'lv':>2} {'strategy':<15} {'win%':>6} {'turns':>6} {'hp lost':>8} {'exp/t':>6} {'gold/t':>6}")
+    for row in results:
+        print(
+            f"{row['enemy']:<10} {row['level']:>2} {row['strategy']:<15} {row['win_rate'] * 100:>6.1f}"
+            f" {row['turns_to_kill']:>6.2f} {row['hp_lost']:>8.1f} {row['exp_per_turn']:>6.2f} {row['gold_per_turn']:>6.2f}"
+        )
+    total = args.battles * len(results)
+    print(f"{total} battles in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare pygame.sprite.groupcollide with the spatial hash broad phase
+
+Run with: python benchmarks/bench_collision.py
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from spatial_hash import groupcollide
+
+# (enemies, bullets) per run
+SIZES = [(40, 10), (500, 100), (2000, 300), (10000, 1000)]
+REPEATS = 5
+
+
+def make_group(count, size, world, rng):
+    group = pygame.sprite.Group()
+    for _ in range(count):
+        sprite = pygame.sprite.Sprite()
+        sprite.rect = pygame.Rect(rng.randrange(world[0]), rng.randrange(world[1]), *size)
+        group.add(sprite)
+    return group
+
+
+def measure(collide, bullets, enemies):
+    collide(bullets, enemies, False, False)  # Warm up
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        hits = collide(bullets, enemies, False, False)
+    return (time.perf_counter() - start) / REPEATS * 1000, len(hits)
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'enemies':>8} {'bullets':>8} {'groupcollide ms':>16} {'spatial hash ms':>16}")
+    for enemy_count, bullet_count in SIZES:
+        # Keep density constant by growing the world with the enemy count
+        side = int(800 * (enemy_count / 40) ** 0.5)
+        world = (side, side)
+        enemies = make_group(enemy_count, (40, 40), world, rng)
+        bullets = make_group(bullet_count, (5, 10), world, rng)
+        naive, naive_hits = measure(pygame.sprite.groupcollide, bullets, enemies)
+        hashed, hashed_hits = measure(groupcollide, bullets, enemies)
+        assert naive_hits == hashed_hits
+        print(f"{enemy_count:>8} {bullet_count:>8} {naive:>16.3f} {hashed:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Generate large dungeons and compare DungeonGrid with a list-of-lists map
+
+Run with: python benchmarks/bench_dungeon.py
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dungeon import generate_rooms, FLOOR
+from raycaster import cast_ray
+
+SIZES = [256, 1024, 4096]
+RAYS = 20000
+LOOKUPS = 1000000
+
+
+def list_size(rows):
+    """Bytes used by a list of lists of ints (the ints 0 and 1 are shared)"""
+    return sys.getsizeof(rows) + sum(sys.getsizeof(row) for row in rows)
+
+
+def main():
+    print(f"{'size':>6} {'generate s':>11} {'grid MB':>8} {'lists MB':>9} "
+          f"{'grid lookup ns':>15} {'list lookup ns':>15} {'rays/s':>9}")
+    rng = random.Random(1)
+    for size in SIZES:
+        start = time.perf_counter()
+        grid = generate_rooms(size, size, seed=1)
+        generate = time.perf_counter() - start
+        rows = grid.rows()
+
+        points = [(rng.randrange(size), rng.randrange(size)) for _ in range(LOOKUPS)]
+        start = time.perf_counter()
+        grid_floors = sum(1 for x, y in points if grid.get(x, y) == FLOOR)
+        grid_lookup = (time.perf_counter() - start) / LOOKUPS * 1e9
+        start = time.perf_counter()
+        list_floors = sum(1 for x, y in points if rows[y][x] == FLOOR)
+        list_lookup = (time.perf_counter() - start) / LOOKUPS * 1e9
+        assert grid_floors == list_floors
+
+        # Rays from the start cell in every direction
+        pos_x, pos_y = grid.start[0] + 0.5, grid.start[1] + 0.5
+        start = time.perf_counter()
+        for i in range(RAYS):
+            angle = 2 * math.pi * i / RAYS
+            cast_ray(grid, pos_x, pos_y, math.cos(angle), math.sin(angle), 64)
+        rays = RAYS / (time.perf_counter() - start)
+
+        print(f"{size:>6} {generate:>11.2f} {len(grid.cells) / 2 ** 20:>8.1f} "
+              f"{list_size(rows) / 2 ** 20:>9.1f} {grid_lookup:>15.0f} {list_lookup:>15.0f} {rays:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
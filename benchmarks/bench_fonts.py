@@ -0,0 +1,64 @@
+"""Compare the score display of space_invaders.py before and after font caching
+
+Run with: python benchmarks/bench_fonts.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from text_cache import get_font, render_text
+
+FRAMES = 600
+WHITE = (255, 255, 255)
+
+
+def score_at(frame):
+    """Score that goes up by 10 every 30 frames, like a steady hit rate"""
+    return frame // 30 * 10
+
+
+def per_frame_font(screen):
+    """Old loop: load the font and render the score every frame"""
+    for frame in range(FRAMES):
+        font = pygame.font.SysFont(None, 36)
+        score_text = font.render(f"Score: {score_at(frame)}", True, WHITE)
+        screen.blit(score_text, (10, 10))
+
+
+def cached_font(screen):
+    """New loop: font from the registry, score re-rendered only on change"""
+    score_font = get_font(None, 36)
+    score_text = None
+    drawn_score = None
+    for frame in range(FRAMES):
+        score = score_at(frame)
+        if score != drawn_score:
+            score_text = render_text(score_font, f"Score: {score}", WHITE)
+            drawn_score = score
+        screen.blit(score_text, (10, 10))
+
+
+def measure(func, screen):
+    start = time.perf_counter()
+    func(screen)
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    before = measure(per_frame_font, screen)
+    after = measure(cached_font, screen)
+    print(f"per-frame SysFont: {before:.4f} ms/frame")
+    print(f"cached font/score: {after:.4f} ms/frame")
+    print(f"speedup: {before / after:.1f}x")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
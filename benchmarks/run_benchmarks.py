@@ -0,0 +1,353 @@
+"""Headless benchmark suite for both games, checked against a stored baseline
+
+Run with: python benchmarks/run_benchmarks.py
+
+Every benchmark times one frame's worth of work (the 3D view at several ray
+counts and map sizes, the minimap, the HUD, sprites, and the space invaders
+step and draw at growing entity counts) with the SDL dummy video driver, so
+no window is needed.  Results are printed next to benchmarks/baseline.json
+and the run fails (exit status 1) if any benchmark got slower than its
+baseline by more than --tolerance and by more than --min-slowdown ms.  After
+an intended change in speed, or on a new machine, store new numbers with
+--update-baseline.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+pygame.init()
+screen = pygame.display.set_mode((800, 600))
+
+from billboards import Billboards, make_monster_sprite
+from dungeon import DungeonGrid, generate_rooms
+from invaders_engine import GameState as InvadersState
+from minimap import MinimapLayer
+from raycast_view import RaycastView
+from text_cache import get_font, render_text
+from wizardry_engine import DIRECTIONS, dungeon_map
+
+try:
+    import numpy as np
+except ImportError:  # Without NumPy the views are cast one ray at a time
+    np = None
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+TOLERANCE = 0.3  # Allowed slowdown against the baseline (0.3 = 30%)
+MIN_SLOWDOWN = 0.1  # Milliseconds a benchmark must also have slowed down by to fail
+REPEATS = 5  # Measurements per benchmark
+FRAMES = 20  # Frames per run
+MIN_RUN_TIME = 0.1  # Seconds timed per measurement, at the least (more runs for fast benchmarks)
+
+WIDTH, HEIGHT = 800, 600
+MAX_DEPTH = 8
+PLANE_LENGTH = math.tan(math.pi / 6)
+VIEWS = 16  # Different views cycled through by the view benchmarks
+CALIBRATION = "calibration"  # Scales the baseline to the speed of this machine
+
+MAPS = {
+    "classic": lambda: DungeonGrid.from_rows(dungeon_map),
+    "rooms256": lambda: generate_rooms(256, 256, seed=1),
+    "rooms1024": lambda: generate_rooms(1024, 1024, seed=1),
+}
+RAY_COUNTS = [60, 120, 400, 800]
+SCALES = [2, 4]  # Resolution divisors for the low-resolution views
+INVADER_COUNTS = [(5, 8), (20, 25), (40, 50), (100, 100)]  # Rows x columns: 40 to 10k invaders
+BULLETS = 1000
+
+# Maps are generated once and shared by the benchmarks
+maps = {}
+
+
+def get_map(name):
+    if name not in maps:
+        maps[name] = MAPS[name]()
+    return maps[name]
+
+
+def sample_views(grid, count, seed=1):
+    """Random floor cells and directions to render from"""
+    rng = random.Random(seed)
+    views = []
+    while len(views) < count:
+        x = rng.randrange(grid.width)
+        y = rng.randrange(grid.height)
+        if not grid.is_wall(x, y):
+            views.append((x, y, DIRECTIONS[rng.randrange(4)]))
+    return views
+
+
+def cast_rays_benchmark(map_name, num_rays, textured, scale=1, vectorized=True):
+    """The 3D view (what the game's cast_rays() does on a view cache miss)"""
+    def setup():
+        grid = get_map(map_name)
+        view = RaycastView(WIDTH, HEIGHT, num_rays, MAX_DEPTH, PLANE_LENGTH, textured, vectorized)
+        view.set_quality(num_rays, scale)
+        views = sample_views(grid, VIEWS)
+        # Build the wall strips the views need, as a running game would have
+        for x, y, direction in views:
+            view.render(screen, grid, x, y, direction)
+        frames = itertools.count()
+
+        def frame():
+            x, y, direction = views[next(frames) % VIEWS]
+            view.render(screen, grid, x, y, direction)
+        return frame
+    return setup
+
+
+def minimap_benchmark():
+    """The scrolling minimap while walking across a large map"""
+    def setup():
+        grid = get_map("rooms256")
+        minimap = MinimapLayer(grid, 20, 10, [(255, 255, 255), (0, 0, 0), (0, 0, 255), (0, 255, 0)])
+        path = [(x, y) for x, y, _ in sample_views(grid, 64)]
+        frames = itertools.count()
+
+        def frame():
+            x, y = path[next(frames) // 4 % len(path)]
+            minimap.draw(screen, (600, 400), x, y, (0, -1), (255, 0, 0), (0, 255, 0))
+        return frame
+    return setup
+
+
+def hud_benchmark():
+    """The status bar: HP / MP bars and four lines of text"""
+    def setup():
+        font = get_font(None, 36)
+        frames = itertools.count()
+
+        def frame():
+            hp = 100 - next(frames) % 3  # A value that changes now and then
+            pygame.draw.rect(screen, (255, 0, 0), (20, 20, 150 * hp / 100, 20))
+            pygame.draw.rect(screen, (255, 255, 255), (20, 20, 150, 20), 2)
+            pygame.draw.rect(screen, (0, 0, 255), (20, 50, 150, 20))
+            pygame.draw.rect(screen, (255, 255, 255), (20, 50, 150, 20), 2)
+            for i, text in enumerate([f"HP: {hp}/100", "MP: 50/50", "Lv: 1 EXP: 0/100", "Gold: 0"]):
+                screen.blit(render_text(font, text, (255, 255, 255)), (180, 20 + 30 * i))
+        return frame
+    return setup
+
+
+def sprites_benchmark(count):
+    """Monster sprites in front of the camera, partly hidden by walls"""
+    def setup():
+        sprites = Billboards(
+            [make_monster_sprite((60, 200, 60))], lambda height: 200,
+            0.7 * 2 * HEIGHT / MAX_DEPTH, 0.7 * 4 * HEIGHT, 0.7
+        )
+        rng = random.Random(1)
+        positions = [(rng.uniform(-4, 4), -rng.uniform(1, MAX_DEPTH), 0) for _ in range(count)]
+        depth = [rng.uniform(1, MAX_DEPTH) for _ in range(WIDTH)]
+        camera = (0.0, 0.0, 0, -1, PLANE_LENGTH, 0)
+        sprites.draw(screen, positions, camera, depth, HEIGHT)
+
+        def frame():
+            sprites.draw(screen, positions, camera, depth, HEIGHT)
+        return frame
+    return setup
+
+
+def invaders_state(rows, columns):
+    """A fresh invaders game with BULLETS bullets spread over the screen"""
+    state = InvadersState(rows, columns, pool_size=BULLETS)
+    rng = random.Random(1)
+    for _ in range(BULLETS):
+        state.shoot()
+    for bullet in state.bullets:
+        bullet.rect.center = (rng.randrange(WIDTH), rng.randrange(HEIGHT))
+    return state
+
+
+def invaders_step_benchmark(rows, columns):
+    """GameState.step(): movement and bullet / invader collisions"""
+    def setup():
+        state = invaders_state(rows, columns)
+
+        def frame():
+            state.step(("left",))
+        return frame
+    return setup
+
+
+def invaders_draw_benchmark(rows, columns):
+    """The formation and all sprites drawn to the screen"""
+    def setup():
+        state = invaders_state(rows, columns)
+
+        def frame():
+            screen.fill((0, 0, 0))
+            state.formation.draw(screen)
+            state.all_sprites.draw(screen)
+        return frame
+    return setup
+
+
+def calibration_benchmark():
+    """Fixed Python and pixel work, to tell a slower machine from slower code"""
+    def setup():
+        surface = pygame.Surface((WIDTH, HEIGHT))
+
+        def frame():
+            total = 0
+            for i in range(20000):
+                total += i * i % 7
+            surface.fill((total % 256, 0, 0))
+        return frame
+    return setup
+
+
+def all_benchmarks():
+    """(name, setup) for every benchmark; setup() returns a function running one frame"""
+    benchmarks = [(CALIBRATION, calibration_benchmark())]
+    for map_name in MAPS:
+        for num_rays in RAY_COUNTS:
+            benchmarks.append((f"cast_rays/{map_name}/{num_rays}", cast_rays_benchmark(map_name, num_rays, False)))
+            benchmarks.append((
+                f"cast_rays/{map_name}/{num_rays}/scalar", cast_rays_benchmark(map_name, num_rays, False, vectorized=False)
+            ))
+        benchmarks.append((f"cast_rays/{map_name}/{WIDTH}/textured", cast_rays_benchmark(map_name, WIDTH, True)))
+        # Lower resolutions the game's quality governor can drop to
+        for scale in SCALES:
+            benchmarks.append((
+                f"cast_rays/{map_name}/{WIDTH // scale}/scale{scale}",
+                cast_rays_benchmark(map_name, WIDTH // scale, False, scale)
+            ))
+            benchmarks.append((
+                f"cast_rays/{map_name}/{WIDTH // scale}/textured/scale{scale}",
+                cast_rays_benchmark(map_name, WIDTH // scale, True, scale)
+            ))
+    benchmarks.append(("minimap", minimap_benchmark()))
+    benchmarks.append(("hud", hud_benchmark()))
+    benchmarks.append(("sprites/24", sprites_benchmark(24)))
+    for rows, columns in INVADER_COUNTS:
+        benchmarks.append((f"invaders/step/{rows * columns}", invaders_step_benchmark(rows, columns)))
+        benchmarks.append((f"invaders/draw/{rows * columns}", invaders_draw_benchmark(rows, columns)))
+    return benchmarks
+
+
+def time_run(setup, frames=FRAMES, min_time=MIN_RUN_TIME):
+    """Milliseconds per frame over fresh runs of frames frames, min_time seconds of them in all
+
+    Every run starts from a new setup(), so a fast benchmark timed over more
+    runs still times the same frames (the invaders' bullets don't fly off).
+    """
+    elapsed = 0.0
+    count = 0
+    while elapsed < min_time:
+        frame = setup()
+        frame()  # Warm up
+        start = time.perf_counter()
+        for _ in range(frames):
+            frame()
+        elapsed += time.perf_counter() - start
+        count += frames
+    return elapsed / count * 1000
+
+
+def measure(benchmarks, repeats=REPEATS):
+    """Median and best milliseconds per frame of every benchmark
+
+    The runs are taken in rounds over all the benchmarks rather than one
+    benchmark at a time, so a slow spell on the machine is spread over all of
+    them (and the calibration benchmark) instead of hitting just one.
+    """
+    times = {name: [] for name, _ in benchmarks}
+    for _ in range(repeats):
+        for name, setup in benchmarks:
+            times[name].append(time_run(setup))
+    return {name: {"ms": statistics.median(runs), "min_ms": min(runs)} for name, runs in times.items()}
+
+
+def compare(results, baseline, tolerance, min_slowdown=MIN_SLOWDOWN):
+    """Print results next to the baseline; return the names that regressed
+
+    The best run of each benchmark is compared, as it is the least disturbed
+    by whatever else the machine is doing, after scaling the baseline by how
+    much faster or slower the calibration benchmark ran.  A benchmark
+    regressed when it is slower by more than tolerance and by more than
+    min_slowdown milliseconds, as a benchmark taking well under a
+    millisecond can be off by a large share from noise alone.
+    """
+    regressions = []
+    speed = 1.0
+    if CALIBRATION in results and CALIBRATION in baseline:
+        speed = results[CALIBRATION]["min_ms"] / baseline[CALIBRATION]["min_ms"]
+        print(f"machine speed against the baseline: {1 / speed:.2f}x")
+    print(f"{'benchmark':<42} {'median ms':>10} {'best ms':>9} {'baseline':>9} {'change':>8}")
+    for name, result in results.items():
+        line = f"{name:<42} {result['ms']:>10.3f} {result['min_ms']:>9.3f}"
+        base = baseline.get(name)
+        if base is None:
+            print(f"{line} {'-':>9} {'new':>8}")
+            continue
+        expected = base["min_ms"] * speed
+        change = result["min_ms"] / expected - 1
+        flag = ""
+        if change > tolerance and result["min_ms"] - expected > min_slowdown and name != CALIBRATION:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{line} {base['min_ms']:>9.3f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmarks and compare them with the baseline.")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", metavar="PATH", help="also write the results to PATH as JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown before a benchmark fails (default: 0.3 = 30%%)")
+    parser.add_argument("--min-slowdown", type=float, default=MIN_SLOWDOWN, metavar="MS",
+                        help="milliseconds a benchmark must also have slowed down by to fail (default: 0.1)")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    benchmarks = [(name, setup) for name, setup in all_benchmarks() if args.filter in name or name == CALIBRATION]
+    results = measure(benchmarks, args.repeats)
+    report = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np is not None,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    regressions = compare(results, baseline, args.tolerance, args.min_slowdown)
+
+    if args.update_baseline:
+        # Keep baseline entries of benchmarks that were not run
+        baseline.update(results)
+        report["results"] = baseline
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"baseline written to {args.baseline}")
+    elif regressions:
+        print(
+            f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}"
+            f" and {args.min_slowdown} ms"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
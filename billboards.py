@@ -0,0 +1,95 @@
+import pygame
+
+from wall_textures import HeightLevels
+
+SPRITE_SIZE = 64
+NEAR_PLANE = 0.2  # Sprites closer to the camera than this are not drawn
+
+
+def make_monster_sprite(color, size=SPRITE_SIZE):
+    """Monster picture drawn in code: a body with eyes on a transparent background"""
+    sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+    body = pygame.Rect(size // 8, size // 4, size * 3 // 4, size * 3 // 4)
+    pygame.draw.ellipse(sprite, color, body)
+    dark = tuple(channel // 2 for channel in color)
+    pygame.draw.ellipse(sprite, dark, body, max(1, size // 32))
+    for eye_x in (size * 3 // 8, size * 5 // 8):
+        pygame.draw.circle(sprite, (255, 255, 255), (eye_x, size // 2), size // 10)
+        pygame.draw.circle(sprite, (0, 0, 0), (eye_x, size // 2), size // 20)
+    return sprite
+
+
+class Billboards:
+    """Camera-facing sprites drawn into a raycast view, hidden behind walls
+
+    ``images`` maps a sprite key to its picture.  Scaled copies are made per
+    height level (see wall_textures.HeightLevels) with ``shade(height)``
+    baked in and cached, so a sprite costs a lookup and a few blits.  Only
+    sprites in front of the camera and inside the view are sorted and
+    drawn; each screen column of a sprite is hidden if the depth buffer
+    (the wall distance per column) says a wall is nearer.
+    """
+
+    def __init__(self, images, shade, min_height, max_height, scale=1.0):
+        self.images = images
+        self.shade = shade
+        self.scale = scale  # Sprite height relative to a wall at the same distance
+        self.heights = HeightLevels(min_height, max_height)
+        self.scaled = {}
+
+    def image(self, key, level):
+        """The picture for key scaled to a height level, shading included"""
+        image = self.scaled.get((key, level))
+        if image is None:
+            height = self.heights.height(level)
+            image = pygame.transform.scale(self.images[key], (height, height))
+            shade = int(self.shade(height / self.scale))
+            image.fill((shade, shade, shade), special_flags=pygame.BLEND_RGB_MULT)
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            self.scaled[(key, level)] = image
+        return image
+
+    def draw(self, surface, sprites, camera, depth, view_height):
+        """Draw sprites, (x, y, key) in map coordinates, as seen from camera
+
+        ``camera`` is (pos_x, pos_y, dir_x, dir_y, plane_x, plane_y) as used
+        for the raycast and ``depth`` holds the wall distance for every
+        screen column.  Returns the number of sprites inside the view.
+        """
+        pos_x, pos_y, dir_x, dir_y, plane_x, plane_y = camera
+        view_width = len(depth)
+        inv_det = 1 / (plane_x * dir_y - dir_x * plane_y)
+
+        # Camera space position of each sprite; keep those in the view
+        visible = []
+        for x, y, key in sprites:
+            rel_x = x - pos_x
+            rel_y = y - pos_y
+            distance = inv_det * (plane_x * rel_y - plane_y * rel_x)
+            if distance < NEAR_PLANE:
+                continue
+            level = self.heights.level(self.scale * 2 * view_height / distance)
+            size = self.heights.height(level)
+            center = view_width / 2 * (1 + inv_det * (dir_y * rel_x - dir_x * rel_y) / distance)
+            left = int(center - size / 2)
+            if left < view_width and left + size > 0:
+                visible.append((distance, left, size, level, key))
+
+        # Far to near, so nearer sprites cover farther ones
+        visible.sort(reverse=True)
+        for distance, left, size, level, key in visible:
+            image = self.image(key, level)
+            top = int(view_height / 2 + view_height / distance) - size
+            # Blit each run of columns that no wall hides
+            column = max(left, 0)
+            end = min(left + size, view_width)
+            while column < end:
+                while column < end and depth[column] <= distance:
+                    column += 1
+                start = column
+                while column < end and depth[column] > distance:
+                    column += 1
+                if column > start:
+                    surface.blit(image, (start, top), (start - left, 0, column - start, size))
+        return len(visible)
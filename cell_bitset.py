@@ -0,0 +1,46 @@
+class CellBitset:
+    """One bit per map cell, e.g. the cells a player has explored
+
+    A 4096x4096 map needs 2 MB.  The byte range touched since the last
+    ``take_dirty()`` is tracked so a save file can rewrite just that part.
+    """
+
+    def __init__(self, width, height, bits=None):
+        self.width = width
+        self.height = height
+        self.bits = bits if bits is not None else bytearray((width * height + 7) // 8)
+        self.dirty_start = len(self.bits)
+        self.dirty_end = 0
+
+    def has(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            index = y * self.width + x
+            return self.bits[index >> 3] >> (index & 7) & 1 == 1
+        return False
+
+    def add(self, x, y):
+        """Set the bit for (x, y); return True if it was not set before"""
+        index = y * self.width + x
+        byte = index >> 3
+        mask = 1 << (index & 7)
+        if self.bits[byte] & mask:
+            return False
+        self.bits[byte] |= mask
+        if byte < self.dirty_start:
+            self.dirty_start = byte
+        if byte >= self.dirty_end:
+            self.dirty_end = byte + 1
+        return True
+
+    def count(self):
+        """Number of set bits"""
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def take_dirty(self):
+        """Return and reset the (start, end) byte range changed so far, or None"""
+        if self.dirty_start >= self.dirty_end:
+            return None
+        dirty = (self.dirty_start, self.dirty_end)
+        self.dirty_start = len(self.bits)
+        self.dirty_end = 0
+        return dirty
@@ -0,0 +1,223 @@
+"""Multi-floor dungeons streamed chunk by chunk from a memory-mapped file
+
+File layout (all integers little endian):
+
+    header       b"DUNGEONC", version (u16), width, height (u32),
+                 floors, chunk size (u16)
+    floor table  start x, start y, exit x, exit y (u32) per floor
+    chunks       floor by floor, row of chunks by row of chunks, each chunk
+                 chunk size x chunk size cells, row-major, one byte per cell
+
+Every chunk is one contiguous run of bytes, so loading it is a single slice
+of the mapping.  Cells past the right / bottom edge of the map are stored as
+WALL.  Build a file with:
+
+    python chunked_dungeon.py dungeon.dgn --size 4096 --floors 3
+"""
+import argparse
+import mmap
+import struct
+import time
+from collections import OrderedDict
+
+from dungeon import WALL, STAIRS_DOWN, STAIRS_UP, generate_rooms, generate_maze
+
+FILE_MAGIC = b"DUNGEONC"
+FILE_VERSION = 1
+HEADER = struct.Struct("<8sHIIHH")
+FLOOR_ENTRY = struct.Struct("<IIII")
+
+CHUNK_SIZE = 64  # Cells per chunk side (4 KB per chunk)
+MAX_CHUNKS = 64  # Chunks kept in memory
+PREFETCH_CHUNKS = 2  # Chunks loaded ahead of the player in the facing direction
+
+
+def write_dungeon(path, width, height, floor_count, floors, chunk_size=CHUNK_SIZE):
+    """Write floors (an iterable of DungeonGrid) to a chunked dungeon file
+
+    Floors are encoded and written one at a time, so only one floor needs to
+    be in memory; pass a generator to build dungeons larger than memory.
+    """
+    chunks_x = -(-width // chunk_size)
+    chunks_y = -(-height // chunk_size)
+    table = []
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(FILE_MAGIC, FILE_VERSION, width, height, floor_count, chunk_size))
+        # Floor table placeholder, filled in once every floor has been seen
+        file.write(bytes(floor_count * FLOOR_ENTRY.size))
+        for grid in floors:
+            if (grid.width, grid.height) != (width, height):
+                raise ValueError("every floor must have the same size")
+            table.append(grid.start + (grid.exit or grid.start))
+            file.write(encode_floor(grid, chunks_x, chunks_y, chunk_size))
+        if len(table) != floor_count:
+            raise ValueError(f"expected {floor_count} floors, got {len(table)}")
+        file.seek(HEADER.size)
+        for entry in table:
+            file.write(FLOOR_ENTRY.pack(*entry))
+
+
+def encode_floor(grid, chunks_x, chunks_y, chunk_size):
+    """Chunk-major bytes of one floor"""
+    out = bytearray()
+    for chunk_y in range(chunks_y):
+        for chunk_x in range(chunks_x):
+            out += grid.region(chunk_x * chunk_size, chunk_y * chunk_size, chunk_size, chunk_size)
+    return out
+
+
+class ChunkedDungeon:
+    """Dungeon file read lazily in fixed-size chunks, one floor at a time
+
+    Opening a file only reads the header, so startup costs the same for any
+    size.  Chunks are copied out of the memory map on first use and kept in
+    an LRU of at most ``max_chunks`` entries, so resident memory is bounded
+    by ``max_chunks * chunk_size ** 2`` bytes no matter how big the dungeon
+    is.  Offers the same accessors as DungeonGrid (get, is_wall, region,
+    start, exit, floor, floors, resident, prefetch), so the engine, raycaster
+    and minimap work on either.
+    """
+
+    # Reading a whole floor would cycle every chunk through the LRU
+    resident = False
+
+    def __init__(self, path, max_chunks=MAX_CHUNKS, floor=0):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.floors, self.chunk_size = HEADER.unpack_from(self.map)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a chunked dungeon file")
+        if version != FILE_VERSION:
+            raise ValueError(f"unsupported dungeon file version {version}")
+        self.floor_table = [
+            FLOOR_ENTRY.unpack_from(self.map, HEADER.size + i * FLOOR_ENTRY.size)
+            for i in range(self.floors)
+        ]
+        self.chunks_x = -(-self.width // self.chunk_size)
+        self.chunks_y = -(-self.height // self.chunk_size)
+        self.chunk_bytes = self.chunk_size * self.chunk_size
+        self.floor_bytes = self.chunks_x * self.chunks_y * self.chunk_bytes
+        self.data_offset = HEADER.size + self.floors * FLOOR_ENTRY.size
+
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.loads = 0
+        self.hits = 0
+        self.floor = floor
+
+    @property
+    def start(self):
+        """Start cell of the current floor (where stairs down arrive)"""
+        return self.floor_table[self.floor][:2]
+
+    @property
+    def exit(self):
+        """Exit cell of the current floor (where stairs up arrive)"""
+        return self.floor_table[self.floor][2:]
+
+    def set_floor(self, floor):
+        if not 0 <= floor < self.floors:
+            raise ValueError(f"no floor {floor}")
+        self.floor = floor
+
+    def chunk(self, floor, chunk_x, chunk_y):
+        """Cells of one chunk, loading it if it is not resident"""
+        key = (floor, chunk_x, chunk_y)
+        cells = self.chunks.get(key)
+        if cells is not None:
+            self.chunks.move_to_end(key)
+            self.hits += 1
+            return cells
+
+        offset = (
+            self.data_offset + floor * self.floor_bytes
+            + (chunk_y * self.chunks_x + chunk_x) * self.chunk_bytes
+        )
+        cells = self.map[offset:offset + self.chunk_bytes]
+        self.loads += 1
+        self.chunks[key] = cells
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return cells
+
+    def get(self, x, y):
+        """Cell value at (x, y) on the current floor; WALL outside the map"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            size = self.chunk_size
+            cells = self.chunk(self.floor, x // size, y // size)
+            return cells[(y % size) * size + x % size]
+        return WALL
+
+    def is_wall(self, x, y):
+        return self.get(x, y) == WALL
+
+    def region(self, x, y, width, height):
+        """Row-major bytes of a rectangle; cells outside the map read as WALL"""
+        cells = bytearray([WALL]) * (width * height)
+        size = self.chunk_size
+        left = max(x, 0)
+        right = min(x + width, self.width)
+        for row in range(max(y, 0), min(y + height, self.height)):
+            chunk_y, cell_y = divmod(row, size)
+            column = left
+            # Copy the row one chunk-wide segment at a time
+            while column < right:
+                chunk_x, cell_x = divmod(column, size)
+                end = min(right, (chunk_x + 1) * size)
+                chunk = self.chunk(self.floor, chunk_x, chunk_y)
+                source = cell_y * size + cell_x
+                target = (row - y) * width + column - x
+                cells[target:target + end - column] = chunk[source:source + end - column]
+                column = end
+        return cells
+
+    def prefetch(self, x, y, direction):
+        """Load the chunks ahead of (x, y) along the direction vector"""
+        dx, dy = direction
+        for i in range(1, PREFETCH_CHUNKS + 1):
+            ahead_x = x + dx * i * self.chunk_size
+            ahead_y = y + dy * i * self.chunk_size
+            if 0 <= ahead_x < self.width and 0 <= ahead_y < self.height:
+                self.chunk(self.floor, ahead_x // self.chunk_size, ahead_y // self.chunk_size)
+
+    def close(self):
+        self.chunks.clear()
+        self.map.close()
+        self.file.close()
+
+
+def generate_floors(width, height, floors, seed, kind="rooms"):
+    """Yield generated floors joined by stairs at each floor's start and exit"""
+    generate = generate_rooms if kind == "rooms" else generate_maze
+    for floor in range(floors):
+        grid = generate(width, height, f"{seed}:floor{floor}")
+        if floor > 0:
+            grid.set(*grid.start, STAIRS_UP)
+        if floor < floors - 1:
+            grid.set(*grid.exit, STAIRS_DOWN)
+        yield grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a multi-floor chunked dungeon file.")
+    parser.add_argument("path")
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--floors", type=int, default=3)
+    parser.add_argument("--kind", choices=["rooms", "maze"], default="rooms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_dungeon(
+        args.path, args.size, args.size, args.floors,
+        generate_floors(args.size, args.size, args.floors, args.seed, args.kind),
+        args.chunk_size,
+    )
+    print(f"{args.floors} floors of {args.size}x{args.size} written to {args.path} "
+          f"in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
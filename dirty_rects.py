@@ -0,0 +1,69 @@
+import pygame
+
+
+class RegionTracker:
+    """Track named screen regions and collect the ones whose content changed
+
+    Each frame the game calls ``check(name, key, rect)`` for every region,
+    where ``key`` is anything that fully describes what the region shows.
+    Regions whose key differs from the previous frame are marked dirty, and
+    ``present()`` sends only those rectangles to the display.
+
+    Something that changes every frame and is drawn on top of the rest
+    (like a profiler overlay) is drawn with ``draw()``, which keeps track of
+    where it was so it can grow, shrink or go away without leaving stale
+    pixels on the display.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.dirty = []
+        self.overlay = None  # Where the overlay was drawn last frame
+
+    def check(self, name, key, rect):
+        """Mark the region dirty if its key changed; return True if it did"""
+        if name in self.keys and self.keys[name] == key:
+            return False
+        self.keys[name] = key
+        self.dirty.append(pygame.Rect(rect))
+        return True
+
+    def add(self, rect):
+        """Mark an arbitrary rectangle dirty for this frame"""
+        self.dirty.append(pygame.Rect(rect))
+
+    def invalidate(self):
+        """Forget every key so the next frame redraws all regions"""
+        self.keys.clear()
+
+    def clip_rect(self):
+        """Bounding rectangle of this frame's dirty regions, or None"""
+        if not self.dirty:
+            return None
+        return self.dirty[0].unionall(self.dirty[1:])
+
+    def draw(self, surface, draw_frame, draw_overlay=None):
+        """Redraw the dirty regions with draw_frame(), then draw_overlay() on top
+
+        ``draw_overlay()`` returns the rectangle it drew and is not clipped,
+        so all of it shows even where nothing else changed.  Both that
+        rectangle and the one the overlay covered last frame are updated, the
+        old one redrawn by draw_frame() first.
+        """
+        if self.overlay is not None:
+            self.dirty.append(self.overlay)
+        clip = self.clip_rect()
+        if clip is not None:
+            surface.set_clip(clip)
+            draw_frame()
+            surface.set_clip(None)
+        self.overlay = None
+        if draw_overlay is not None:
+            self.overlay = pygame.Rect(draw_overlay())
+            self.dirty.append(self.overlay)
+
+    def present(self):
+        """Update the dirty regions on the display and start a new frame"""
+        if self.dirty:
+            pygame.display.update(self.dirty)
+        self.dirty = []
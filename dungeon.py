@@ -0,0 +1,224 @@
+from rng_streams import RngStreams
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only DungeonGrid.as_array() needs it
+    np = None
+
+# Cell values
+FLOOR = 0
+WALL = 1
+STAIRS_DOWN = 2
+STAIRS_UP = 3
+
+MAX_SIZE = 4096  # Largest width / height the generators accept
+
+
+class DungeonGrid:
+    """Dungeon map stored as one byte per cell in a row-major bytearray
+
+    A 4096x4096 level takes 16 MB here instead of the hundreds of MB a list
+    of lists of ints needs, and a lookup is one multiply and one index.
+    Cells outside the map read as WALL.  ``start`` is the player's start cell
+    and ``exit`` the cell farthest along the generator's path (if any).  The
+    grid is always fully resident; chunked_dungeon.ChunkedDungeon offers the
+    same accessors for maps streamed from disk.
+    """
+
+    # A DungeonGrid is a single floor
+    floor = 0
+    floors = 1
+    resident = True  # Whole-floor scans are cheap (see navigation.NavIndex)
+
+    def __init__(self, width, height, fill=WALL, start=(1, 1), cells=None):
+        self.width = width
+        self.height = height
+        # cells may also be any writable buffer, such as a memory map of a save file
+        self.cells = cells if cells is not None else bytearray([fill]) * (width * height)
+        self.start = start
+        self.exit = None
+
+    @classmethod
+    def from_rows(cls, rows, start=(1, 1)):
+        """Build a grid from a list of rows of cell values"""
+        grid = cls(len(rows[0]), len(rows), start=start)
+        for y, row in enumerate(rows):
+            grid.cells[y * grid.width:(y + 1) * grid.width] = bytes(row)
+        return grid
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        """Cell value at (x, y); WALL outside the map"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x]
+        return WALL
+
+    def set(self, x, y, value):
+        self.cells[y * self.width + x] = value
+
+    def is_wall(self, x, y):
+        return self.get(x, y) == WALL
+
+    def region(self, x, y, width, height):
+        """Row-major bytes of a rectangle; cells outside the map read as WALL"""
+        cells = bytearray([WALL]) * (width * height)
+        left = max(x, 0)
+        right = min(x + width, self.width)
+        if left >= right:
+            return cells
+        for row in range(max(y, 0), min(y + height, self.height)):
+            start = (row - y) * width + left - x
+            cells[start:start + right - left] = self.cells[row * self.width + left:row * self.width + right]
+        return cells
+
+    def prefetch(self, x, y, direction):
+        """Nothing to load; the whole grid is in memory"""
+
+    def fill_rect(self, x, y, width, height, value):
+        """Set every cell of a rectangle, one row slice at a time"""
+        row = bytes([value]) * width
+        for cell_y in range(y, y + height):
+            start = cell_y * self.width + x
+            self.cells[start:start + width] = row
+
+    def fill_column(self, x, y, height, value):
+        """Set height cells going down from (x, y) with one strided slice"""
+        start = y * self.width + x
+        self.cells[start:start + height * self.width:self.width] = bytes([value]) * height
+
+    def floor_cells(self):
+        """Yield (x, y) of every floor cell in row-major order"""
+        # Searched for as bytes, which a memory map accepts as well as a bytearray
+        floor = bytes([FLOOR])
+        index = self.cells.find(floor)
+        while index != -1:
+            yield index % self.width, index // self.width
+            index = self.cells.find(floor, index + 1)
+
+    def rows(self):
+        """Copy of the map as a list of rows"""
+        return [list(self.cells[y * self.width:(y + 1) * self.width]) for y in range(self.height)]
+
+    def as_array(self):
+        """NumPy (height, width) uint8 view that shares memory with the grid"""
+        return np.frombuffer(self.cells, dtype=np.uint8).reshape(self.height, self.width)
+
+    def copy(self):
+        grid = DungeonGrid(self.width, self.height, start=self.start)
+        grid.cells[:] = self.cells
+        grid.exit = self.exit
+        return grid
+
+
+def check_size(width, height):
+    if not (5 <= width <= MAX_SIZE and 5 <= height <= MAX_SIZE):
+        raise ValueError(f"dungeon size must be between 5 and {MAX_SIZE}, got {width}x{height}")
+
+
+def generate_rooms(width, height, seed=None, room_count=None, min_room=3, max_room=10):
+    """Rooms-and-corridors dungeon; every room is reachable from the start
+
+    Rooms are scattered at random (overlaps just merge into bigger rooms),
+    then visited in a serpentine order over horizontal bands and each one is
+    joined to the previous by an L-shaped corridor.  Neighbors in that order
+    are close together, so corridors stay short and carving is all slice
+    assignments, even for the largest maps.
+    """
+    check_size(width, height)
+    rng = RngStreams(seed).get("rooms")
+    grid = DungeonGrid(width, height)
+    max_room = max(min_room, min(max_room, width - 2, height - 2))
+    if room_count is None:
+        room_count = max(1, width * height // (max_room * max_room * 2))
+
+    # Place rooms (the outer border always stays wall)
+    centers = []
+    for _ in range(room_count):
+        room_w = rng.randint(min_room, max_room)
+        room_h = rng.randint(min_room, max_room)
+        room_x = rng.randint(1, width - room_w - 1)
+        room_y = rng.randint(1, height - room_h - 1)
+        grid.fill_rect(room_x, room_y, room_w, room_h, FLOOR)
+        centers.append((room_x + room_w // 2, room_y + room_h // 2))
+
+    # Serpentine order: left to right in even bands, right to left in odd ones
+    band = max_room * 4
+
+    def order(center):
+        row = center[1] // band
+        return row, center[0] if row % 2 == 0 else -center[0]
+
+    centers.sort(key=order)
+
+    # Connect each room to the previous one
+    for (x1, y1), (x2, y2) in zip(centers, centers[1:]):
+        if rng.random() < 0.5:
+            grid.fill_rect(min(x1, x2), y1, abs(x2 - x1) + 1, 1, FLOOR)
+            grid.fill_column(x2, min(y1, y2), abs(y2 - y1) + 1, FLOOR)
+        else:
+            grid.fill_column(x1, min(y1, y2), abs(y2 - y1) + 1, FLOOR)
+            grid.fill_rect(min(x1, x2), y2, abs(x2 - x1) + 1, 1, FLOOR)
+
+    grid.start = centers[0]
+    grid.exit = centers[-1]
+    return grid
+
+
+def generate_maze(width, height, seed=None):
+    """Perfect maze (exactly one path between any two cells) starting at (1, 1)
+
+    Carved with an iterative depth-first backtracker over the odd cells, so
+    corridors are long and winding.  Works on flat indices into the
+    bytearray; there is no recursion, so any size up to MAX_SIZE is fine.
+    """
+    check_size(width, height)
+    rng = RngStreams(seed).get("maze")
+    grid = DungeonGrid(width, height)
+    cells = grid.cells
+    steps = (-2 * width, 2, 2 * width, -2)  # North, East, South, West
+    # Odd cells that can hold a corridor
+    last_x = width - 2 if width % 2 == 1 else width - 3
+    last_y = height - 2 if height % 2 == 1 else height - 3
+
+    def inside(index, step):
+        x = index % width
+        y = index // width
+        if step == 2:
+            return x + 2 <= last_x
+        if step == -2:
+            return x - 2 >= 1
+        if step > 0:
+            return y + 2 <= last_y
+        return y - 2 >= 1
+
+    start = width + 1
+    cells[start] = FLOOR
+    stack = [start]
+    while stack:
+        index = stack[-1]
+        options = [step for step in steps if inside(index, step) and cells[index + step] == WALL]
+        if not options:
+            stack.pop()
+            continue
+        step = rng.choice(options)
+        cells[index + step // 2] = FLOOR
+        cells[index + step] = FLOOR
+        stack.append(index + step)
+
+    grid.start = (1, 1)
+    grid.exit = (last_x, last_y)
+    return grid
+
+
+def view_window(grid, x, y, radius):
+    """Copy of the cells within radius of (x, y) as (DungeonGrid, origin)
+
+    Works for any grid with region(); used to hand the raycaster a small
+    resident map whatever the size or storage of the dungeon.
+    """
+    size = 2 * radius + 1
+    window = DungeonGrid(size, size)
+    window.cells[:] = grid.region(x - radius, y - radius, size, size)
+    return window, (x - radius, y - radius)
@@ -0,0 +1,73 @@
+"""Fixed-timestep game loop: steps at a fixed rate, frames drawn in between
+
+The game state advances in steps of exactly 1 / rate seconds, however fast
+or slow frames are drawn, so speeds given per step mean the same thing on
+any machine and under any load.  Each frame the loop asks how many steps
+are due for the time that passed, runs them, and draws:
+
+    timestep = FixedTimestep(60)
+    while running:
+        for _ in range(timestep.advance()):
+            state.step(actions)
+        draw(timestep.alpha)
+        clock.tick(max_fps)
+
+When frames are slow, several steps run before the next frame is drawn
+(frames are skipped, the game keeps its speed); past max_steps per frame
+the remaining time is dropped so the game slows down instead of falling
+further and further behind.  When frames are fast, some frames run no step
+at all, and ``alpha`` (0 to 1, how far the time is between the last step
+and the next) lets the drawing place things between their previous and
+current positions with ``lerp()``.
+"""
+import time
+
+MAX_STEPS = 5  # Steps run at most before a frame is drawn
+
+
+def lerp(previous, current, alpha):
+    """Value alpha of the way from previous to current"""
+    return previous + (current - previous) * alpha
+
+
+class FixedTimestep:
+    """Turns elapsed time into a number of fixed-length steps"""
+
+    def __init__(self, rate, max_steps=MAX_STEPS, clock=time.perf_counter):
+        self.rate = rate  # Steps per second
+        self.step_time = 1 / rate
+        self.max_steps = max_steps
+        self.clock = clock
+        self.last_time = None
+        self.lag = 0.0  # Time passed that no step has covered yet
+        self.steps = 0  # Steps run so far
+        self.dropped = 0  # Steps dropped because frames were too slow
+
+    @property
+    def alpha(self):
+        """How far the current time is between the last step and the next one"""
+        return min(1.0, self.lag / self.step_time)
+
+    def advance(self):
+        """Number of steps to run for the time passed since the last call"""
+        now = self.clock()
+        if self.last_time is None:
+            # The first frame runs one step
+            self.lag = self.step_time
+        else:
+            self.lag += now - self.last_time
+        self.last_time = now
+
+        steps = int(self.lag / self.step_time)
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+            self.lag = self.lag % self.step_time + self.step_time * steps
+        self.lag -= self.step_time * steps
+        self.steps += steps
+        return steps
+
+    def reset(self):
+        """Start timing afresh (after the loop was paused)"""
+        self.last_time = None
+        self.lag = 0.0
@@ -0,0 +1,197 @@
+"""Per-frame timings of named code sections, with an on-screen overlay
+
+A game loop calls ``profiler.begin_frame()`` at the top of each frame and
+``profiler.end_frame()`` once the frame's work is done, and wraps the parts
+it wants to see in ``with profiler.section("name"):``.  The last FRAMES
+frames are kept in a ring buffer, from which the overlay shows rolling
+p50 / p95 / p99 times per section.  They can be written out as CSV or as a
+Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev).
+
+While the profiler is disabled ``section()`` hands back one shared object
+whose enter and exit do nothing, so the hooks can stay in the hot path.
+"""
+import csv
+import json
+import time
+
+import pygame
+
+from text_cache import TextCache, get_font
+
+FRAMES = 600  # Frames kept in the ring buffer
+STATS_INTERVAL = 15  # Frames between overlay updates
+PERCENTILES = (50, 95, 99)
+NAME_WIDTH = 120  # Overlay column widths in pixels
+COLUMN_WIDTH = 50
+OVERLAY_TEXTS = 128  # Overlay strings kept rendered (a table's worth)
+
+
+class NullSection:
+    """Section used while profiling is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SECTION = NullSection()
+
+
+class Section:
+    """Times one section and adds it to the profiler's current frame"""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler.events.append((self.name, self.start, end - self.start))
+        return False
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[index]
+
+
+class FrameProfiler:
+    """Ring buffer of per-frame section timings"""
+
+    def __init__(self, frames=FRAMES, enabled=False):
+        self.enabled = enabled
+        self.frames = [None] * frames  # (frame start, frame time, events) per slot
+        self.count = 0  # Frames recorded so far
+        self.events = []
+        self.frame_start = None
+        self.origin = time.perf_counter()
+        self.shown_stats = None
+        # The overlay's numbers change all the time, so they get their own
+        # cache instead of pushing the game's text out of the shared one
+        self.text_cache = TextCache(OVERLAY_TEXTS)
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frame_start = None
+        # Sections timed after this do not belong to a recorded frame
+        self.events = []
+
+    def section(self, name):
+        """Context manager timing the code inside it as section name"""
+        if not self.enabled:
+            return NULL_SECTION
+        return Section(self, name)
+
+    def begin_frame(self):
+        if self.enabled:
+            self.events = []
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.enabled and self.frame_start is not None:
+            frame_time = time.perf_counter() - self.frame_start
+            self.frames[self.count % len(self.frames)] = (self.frame_start, frame_time, self.events)
+            self.count += 1
+
+    def recorded(self):
+        """Recorded frames, oldest first"""
+        if self.count <= len(self.frames):
+            return self.frames[:self.count]
+        split = self.count % len(self.frames)
+        return self.frames[split:] + self.frames[:split]
+
+    def section_names(self):
+        names = {}
+        for _, _, events in self.recorded():
+            for name, _, _ in events:
+                names[name] = None
+        return list(names)
+
+    def frame_times(self):
+        """Milliseconds per frame, whole frame first and then per section name"""
+        names = self.section_names()
+        times = {name: [] for name in ["frame"] + names}
+        for _, frame_time, events in self.recorded():
+            totals = dict.fromkeys(names, 0.0)
+            for name, _, duration in events:
+                totals[name] += duration
+            times["frame"].append(frame_time * 1000)
+            for name in names:
+                times[name].append(totals[name] * 1000)
+        return times
+
+    def stats(self):
+        """(name, p50, p95, p99) in milliseconds for the frame and each section"""
+        stats = []
+        for name, values in self.frame_times().items():
+            if values:
+                values.sort()
+                stats.append((name, *(percentile(values, percent) for percent in PERCENTILES)))
+        return stats
+
+    def write_csv(self, path):
+        """One row per recorded frame with the milliseconds spent in each section"""
+        times = self.frame_times()
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame"] + [f"{name}_ms" for name in times])
+            first = self.count - len(times["frame"])
+            for i, row in enumerate(zip(*times.values())):
+                writer.writerow([first + i] + [f"{value:.3f}" for value in row])
+
+    def write_trace(self, path):
+        """Recorded frames as a Chrome trace (complete events in microseconds)"""
+        trace = []
+        for frame_start, frame_time, events in self.recorded():
+            trace.append({
+                "name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                "ts": (frame_start - self.origin) * 1e6, "dur": frame_time * 1e6,
+            })
+            for name, start, duration in events:
+                trace.append({
+                    "name": name, "ph": "X", "pid": 1, "tid": 1,
+                    "ts": (start - self.origin) * 1e6, "dur": duration * 1e6,
+                })
+        with open(path, "w") as file:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, file)
+
+    def write(self, path):
+        """Write a trace (.json) or CSV (any other extension) file"""
+        if path.endswith(".json"):
+            self.write_trace(path)
+        else:
+            self.write_csv(path)
+
+    def draw(self, surface, topright):
+        """Draw the p50 / p95 / p99 table with its top right corner at topright"""
+        if self.shown_stats is None or self.count % STATS_INTERVAL == 0:
+            self.shown_stats = self.stats()
+        font = get_font(None, 20)
+        rows = [("ms", "p50", "p95", "p99")] + [
+            (name, f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}") for name, p50, p95, p99 in self.shown_stats
+        ]
+        line_height = font.get_linesize()
+        rect = pygame.Rect(0, 0, NAME_WIDTH + COLUMN_WIDTH * 3 + 10, line_height * len(rows) + 10)
+        rect.topright = topright
+        surface.fill((0, 0, 0), rect)
+        for i, row in enumerate(rows):
+            y = rect.y + 5 + i * line_height
+            surface.blit(self.text_cache.render(font, row[0], (0, 255, 0)), (rect.x + 5, y))
+            # Numbers are right-aligned in their columns
+            for column, text in enumerate(row[1:]):
+                text = self.text_cache.render(font, text, (0, 255, 0))
+                surface.blit(text, (rect.x + 5 + NAME_WIDTH + (column + 1) * COLUMN_WIDTH - text.get_width(), y))
+        return rect
+
+
+# Profiler shared by a game and the modules it uses
+profiler = FrameProfiler()
@@ -0,0 +1,264 @@
+import pygame
+import collections
+import itertools
+from array import array
+
+from spatial_hash import SpatialHash
+from frame_profiler import profiler
+
+# スペースインベーダーのゲームロジック
+# 画面（pygame.display）を使わないので、ウィンドウなし・フレームレート制限なしで
+# GameState.step() を好きなだけ回せる
+
+# 画面（ゲーム世界）の大きさ
+WIDTH, HEIGHT = 800, 600
+
+# 1秒あたりの step() の回数
+# 速さはすべて1ステップあたりのピクセル数なので、描画のフレームレートに関係なく
+# ゲームはこの速さで進む（space_invaders.py は固定タイムステップで回す）
+TICK_RATE = 60
+
+# 色の定義
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+
+# 敵の編隊の大きさ
+ENEMY_ROWS = 5
+ENEMY_COLUMNS = 8
+
+# 弾のプールに用意しておく弾の数
+BULLET_POOL_SIZE = 32
+
+# 全ての敵・弾で共有する画像（一度だけ作って塗っておく）
+ENEMY_IMAGE = pygame.Surface((40, 40))
+ENEMY_IMAGE.fill(RED)
+BULLET_IMAGE = pygame.Surface((5, 10))
+BULLET_IMAGE.fill(WHITE)
+
+# step() に渡せる操作
+ACTIONS = ("left", "right", "shoot")
+
+# プレイヤークラス
+class Player(pygame.sprite.Sprite):
+    def __init__(self):
+        super().__init__()
+        self.image = pygame.Surface((50, 30))
+        self.image.fill(GREEN)
+        self.rect = self.image.get_rect()
+        self.rect.centerx = WIDTH // 2
+        self.rect.bottom = HEIGHT - 10
+        self.speed = 8
+
+    def update(self, left=False, right=False):
+        if left and self.rect.left > 0:
+            self.rect.x -= self.speed
+        if right and self.rect.right < WIDTH:
+            self.rect.x += self.speed
+
+# 敵の編隊クラス
+# 編隊は一つの塊として動くので、各敵の位置は編隊内の座標として配列に持ち、
+# 画面上の位置は共通のオフセットを足して求める
+class Formation:
+    def __init__(self, positions, image=ENEMY_IMAGE):
+        self.image = image
+        self.width, self.height = image.get_size()
+        self.xs = array("i", (x for x, y in positions))
+        self.ys = array("i", (y for x, y in positions))
+        self.alive = bytearray([1]) * len(positions)
+        self.count = len(positions)
+        self.offset_x = 0
+        self.offset_y = 0
+        self.speed = 2
+        self.direction = 1
+
+        # 編隊内の座標で作る空間ハッシュ（編隊が動いても作り直さなくてよい）
+        self.grid = SpatialHash()
+        for i in range(self.count):
+            self.grid.insert(i, self.local_rect(i))
+
+        # 列・行ごとの生存数（端の位置をO(1)で求めるため）
+        self.column_counts = collections.Counter(self.xs)
+        self.row_counts = collections.Counter(self.ys)
+        self._update_bounds()
+
+    def __len__(self):
+        return self.count
+
+    def _update_bounds(self):
+        columns = [x for x, n in self.column_counts.items() if n > 0]
+        rows = [y for y, n in self.row_counts.items() if n > 0]
+        self.min_x = min(columns, default=0)
+        self.max_x = max(columns, default=0)
+        self.max_y = max(rows, default=0)
+
+    def local_rect(self, i):
+        return pygame.Rect(self.xs[i], self.ys[i], self.width, self.height)
+
+    def bounds(self):
+        """生き残っている敵全体を囲む画面上の矩形"""
+        top = self.offset_y + min((y for y, n in self.row_counts.items() if n > 0), default=0)
+        return pygame.Rect(
+            self.offset_x + self.min_x,
+            top,
+            self.max_x - self.min_x + self.width,
+            self.offset_y + self.max_y + self.height - top
+        )
+
+    def update(self):
+        self.offset_x += self.speed * self.direction
+        # どれか一体でも端に着いたら、全体の向きを変えて一段下げる
+        left = self.offset_x + self.min_x
+        right = self.offset_x + self.max_x + self.width
+        if right >= WIDTH or left <= 0:
+            self.direction *= -1
+            self.offset_y += 20
+
+    def bottom(self):
+        return self.offset_y + self.max_y + self.height
+
+    def kill(self, i):
+        self.alive[i] = 0
+        self.count -= 1
+        self.grid.remove(i)
+        self.column_counts[self.xs[i]] -= 1
+        self.row_counts[self.ys[i]] -= 1
+        # 端の列・行が空になったときだけ範囲を求め直す
+        if (self.column_counts[self.xs[i]] == 0 and self.xs[i] in (self.min_x, self.max_x)) or (
+            self.row_counts[self.ys[i]] == 0 and self.ys[i] == self.max_y
+        ):
+            self._update_bounds()
+
+    def collide(self, bullets):
+        """弾と敵の衝突判定（当たった弾と敵は消える）"""
+        hits = {}
+        for bullet in bullets.sprites():
+            rect = bullet.rect.move(-self.offset_x, -self.offset_y)
+            collided = [i for i in self.grid.query(rect) if rect.colliderect(self.local_rect(i))]
+            if collided:
+                hits[bullet] = collided
+                bullet.kill()
+                for i in collided:
+                    self.kill(i)
+        return hits
+
+    def draw(self, surface):
+        image = self.image
+        offset_x = self.offset_x
+        offset_y = self.offset_y
+        surface.blits(
+            [
+                (image, (x + offset_x, y + offset_y))
+                for x, y in itertools.compress(zip(self.xs, self.ys), self.alive)
+            ],
+            doreturn=False
+        )
+
+# 弾クラス
+class Bullet(pygame.sprite.Sprite):
+    def __init__(self, pool=None):
+        super().__init__()
+        self.image = BULLET_IMAGE
+        self.rect = self.image.get_rect()
+        self.speed = -10
+        self.pool = pool
+
+    def reset(self, x, y):
+        self.rect.centerx = x
+        self.rect.bottom = y
+
+    def update(self):
+        self.rect.y += self.speed
+        if self.rect.bottom < 0:
+            self.kill()
+
+    def kill(self):
+        # 消えた弾はプールに戻して再利用する
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self.pool is not None:
+            self.pool.release(self)
+
+# 弾のオブジェクトプール
+# 撃つたびに弾を作らず、消えた弾を使い回す（hits/missesは計測用）
+class BulletPool:
+    def __init__(self, capacity=BULLET_POOL_SIZE):
+        self.capacity = capacity
+        self.free = [Bullet(self) for _ in range(capacity)]
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, x, y):
+        if self.free:
+            bullet = self.free.pop()
+            self.hits += 1
+        else:
+            # プールが空なら新しく作る（戻ってきたら容量まではプールに入る）
+            bullet = Bullet(self)
+            self.misses += 1
+        bullet.reset(x, y)
+        return bullet
+
+    def release(self, bullet):
+        if len(self.free) < self.capacity:
+            self.free.append(bullet)
+
+# ゲームの状態
+# 1回の step(actions) が1ステップ（1/TICK_RATE 秒）分の更新に当たる
+class GameState:
+    def __init__(self, rows=ENEMY_ROWS, columns=ENEMY_COLUMNS, pool_size=BULLET_POOL_SIZE):
+        # スプライトグループの作成
+        self.all_sprites = pygame.sprite.RenderUpdates()
+        self.bullets = pygame.sprite.Group()
+        self.bullet_pool = BulletPool(pool_size)
+
+        # プレイヤーの作成
+        self.player = Player()
+        self.all_sprites.add(self.player)
+
+        # 敵の編隊の作成
+        self.formation = Formation([
+            (100 + column * 70, 50 + row * 50)
+            for row in range(rows)
+            for column in range(columns)
+        ])
+
+        self.score = 0
+        self.ticks = 0
+        self.game_over = False
+        self.won = False
+
+    def shoot(self):
+        bullet = self.bullet_pool.acquire(self.player.rect.centerx, self.player.rect.top)
+        self.all_sprites.add(bullet)
+        self.bullets.add(bullet)
+
+    def step(self, actions=()):
+        """1ステップ進める（actionsは "left", "right", "shoot" の並び）"""
+        for action in actions:
+            if action == "shoot":
+                self.shoot()
+
+        # 更新処理
+        with profiler.section("update"):
+            self.player.update("left" in actions, "right" in actions)
+            self.bullets.update()
+            self.formation.update()
+
+        # 弾と敵の衝突判定
+        with profiler.section("collide"):
+            hits = self.formation.collide(self.bullets)
+        self.score += 10 * len(hits)
+
+        # 敵がプレイヤーに到達したらゲームオーバー
+        if len(self.formation) > 0 and self.formation.bottom() >= HEIGHT - 30:
+            self.game_over = True
+
+        # 敵がすべていなくなったら勝利
+        if len(self.formation) == 0:
+            self.won = True
+            self.game_over = True
+
+        self.ticks += 1
+        return hits
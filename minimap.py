@@ -0,0 +1,103 @@
+import pygame
+
+# Color used for the 1px gaps between cells; drawn transparent
+GAP_KEY = (255, 0, 255)
+
+
+class MinimapLayer:
+    """Minimap of a DungeonGrid or ChunkedDungeon
+
+    Only the window of ``view_cells`` x ``view_cells`` cells around the player
+    is shown.  It is read with ``grid.region()`` straight into an 8-bit
+    palettized surface (one pixel per cell), scaled up to ``cell_size``
+    pixels per cell and cached until the player scrolls it or the map
+    changes, so drawing costs the same for a 10x10 map and a 4096x4096 one,
+    and the whole map never has to be resident.  ``colors`` maps cell values
+    to colors.
+
+    With an ``explored`` CellBitset, cells not in it are drawn in
+    ``fog_color``; ``reveal()`` paints newly explored cells straight onto the
+    cached window, so uncovering cells costs only as much as the new cells.
+    """
+
+    def __init__(self, grid, cell_size, view_cells, colors, explored=None, fog_color=(0, 0, 0)):
+        self.grid = grid
+        self.cell_size = cell_size
+        self.view_cells = view_cells
+        self.colors = colors
+        self.explored = explored
+        self.fog_color = fog_color
+        self.window = None
+        self.window_origin = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget the cached window (call after the map or floor has changed)"""
+        self.window_origin = None
+
+    def reveal(self, cells):
+        """Paint newly explored (x, y) cells onto the cached window"""
+        if self.window_origin is None:
+            return
+        origin_x, origin_y = self.window_origin
+        columns = self.window.get_width() // self.cell_size
+        rows = self.window.get_height() // self.cell_size
+        for x, y in cells:
+            if 0 <= x - origin_x < columns and 0 <= y - origin_y < rows:
+                rect = ((x - origin_x) * self.cell_size, (y - origin_y) * self.cell_size,
+                        self.cell_size - 1, self.cell_size - 1)
+                self.window.fill(self.colors[self.grid.get(x, y)], rect)
+
+    def view_origin(self, x, y):
+        """Top-left cell of the window shown when the player is at (x, y)"""
+        width, height = self.grid.width, self.grid.height
+        half = self.view_cells // 2
+        origin_x = max(0, min(x - half, width - self.view_cells))
+        origin_y = max(0, min(y - half, height - self.view_cells))
+        return origin_x, origin_y
+
+    def draw(self, surface, offset, x, y, direction, player_color, direction_color):
+        """Draw the map window at offset, then the player marker at (x, y)"""
+        origin = self.view_origin(x, y)
+        if origin != self.window_origin:
+            self._render_window(origin)
+        surface.blit(self.window, offset)
+
+        # Show player position
+        player_x = offset[0] + (x - origin[0]) * self.cell_size + self.cell_size // 2
+        player_y = offset[1] + (y - origin[1]) * self.cell_size + self.cell_size // 2
+        pygame.draw.circle(surface, player_color, (player_x, player_y), 5)
+
+        # Show player direction
+        dx, dy = direction
+        end_x = player_x + dx * 10
+        end_y = player_y + dy * 10
+        pygame.draw.line(surface, direction_color, (player_x, player_y), (end_x, end_y), 2)
+
+    def _render_window(self, origin):
+        cells_x = min(self.view_cells, self.grid.width)
+        cells_y = min(self.view_cells, self.grid.height)
+        # The grid holds one byte per cell, which is the layer's pixel format
+        cells = self.grid.region(origin[0], origin[1], cells_x, cells_y)
+        if self.explored is not None:
+            fog = len(self.colors)
+            for i in range(len(cells)):
+                if not self.explored.has(origin[0] + i % cells_x, origin[1] + i // cells_x):
+                    cells[i] = fog
+        layer = pygame.image.frombuffer(cells, (cells_x, cells_y), "P")
+        layer.set_palette(list(self.colors) + [self.fog_color, GAP_KEY])
+        window = pygame.transform.scale(layer, (cells_x * self.cell_size, cells_y * self.cell_size))
+        if pygame.display.get_surface() is not None:
+            window = window.convert()
+
+        # Leave a transparent 1px gap on the right and bottom of every cell
+        for i in range(1, cells_x + 1):
+            gap_x = i * self.cell_size - 1
+            pygame.draw.line(window, GAP_KEY, (gap_x, 0), (gap_x, window.get_height() - 1))
+        for i in range(1, cells_y + 1):
+            gap_y = i * self.cell_size - 1
+            pygame.draw.line(window, GAP_KEY, (0, gap_y), (window.get_width() - 1, gap_y))
+        window.set_colorkey(GAP_KEY)
+
+        self.window = window
+        self.window_origin = origin
@@ -0,0 +1,238 @@
+import heapq
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque
+
+from dungeon import FLOOR, WALL
+
+MAX_CACHED_PATHS = 64
+MAX_SEARCH_CELLS = 50000  # Searches give up after visiting this many cells
+LABEL_ROWS = 8  # Rows of the floor labeled per update() (a few ms on a 4096 wide floor)
+
+# Neighbor steps, in the same order as wizardry_engine.DIRECTIONS
+STEPS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+# The one walkability rule for labeling and searching: 0 for floor cells,
+# 1 for walls and stairs (which take the player away, so they can only be
+# the goal of a path)
+BLOCKED = bytes(0 if value == FLOOR else 1 for value in range(256))
+
+# Returned by path() when the search gave up before reaching the goal
+TOO_FAR = "too far"
+
+
+class FloorComponents:
+    """Connected components of one floor's walkable cells, labeled a few rows at a time
+
+    Each row is kept as runs of walkable cells (starts, ends, labels), and
+    runs touching a run in the row above are joined with union-find.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.floor = grid.floor
+        self.parent = array("i")
+        self.rows = []
+
+    @property
+    def done(self):
+        return len(self.rows) == self.grid.height
+
+    def label(self, count):
+        """Label up to count more rows; returns True once every row is labeled"""
+        grid = self.grid
+        width = grid.width
+        parent = self.parent
+        above = self.rows[-1] if self.rows else None
+        for y in range(len(self.rows), min(grid.height, len(self.rows) + count)):
+            mask = grid.region(0, y, width, 1).translate(BLOCKED)
+            starts = array("i")
+            ends = array("i")
+            labels = array("i")
+            x = mask.find(0)
+            while x != -1:
+                end = mask.find(1, x)
+                if end == -1:
+                    end = width
+                starts.append(x)
+                ends.append(end)
+                labels.append(len(parent))
+                parent.append(len(parent))
+                x = mask.find(0, end)
+
+            # Join runs that touch a run in the row above
+            if above is not None:
+                above_starts, above_ends, above_labels = above
+                i = j = 0
+                while i < len(starts) and j < len(above_starts):
+                    if starts[i] < above_ends[j] and above_starts[j] < ends[i]:
+                        a = self.find(labels[i])
+                        b = self.find(above_labels[j])
+                        if a != b:
+                            parent[max(a, b)] = min(a, b)
+                    if ends[i] < above_ends[j]:
+                        i += 1
+                    else:
+                        j += 1
+            self.rows.append((starts, ends, labels))
+            above = (starts, ends, labels)
+        return self.done
+
+    def find(self, label):
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def component(self, x, y):
+        """Component of the walkable cell (x, y), or None"""
+        starts, ends, labels = self.rows[y]
+        i = bisect_right(starts, x) - 1
+        if i >= 0 and x < ends[i]:
+            return self.find(labels[i])
+        return None
+
+
+class NavIndex:
+    """Navigation queries over a dungeon whose walls never change
+
+    Connected components of each floor are labeled a few rows per
+    ``update()`` (the engine calls it every tick), so even a 4096x4096 floor
+    never stalls a frame; once a floor is labeled, a query between two cells
+    that cannot reach each other is answered without searching at all.
+    Paths are found with A* over floor cells (stairs only as the goal) and
+    kept in a small LRU, so following or re-requesting the same route is
+    free.  Searches cost about as much as the area they cover, which is
+    small for the nearby targets auto-walk asks for; they stop after
+    MAX_SEARCH_CELLS so a far target on a huge map can never stall a frame
+    for long.  Maps that are not fully resident (``grid.resident`` false,
+    like a ChunkedDungeon) are never labeled, as that would read every chunk
+    of the floor; their queries always search, bounded the same way.  Call
+    ``invalidate()`` if the map ever changes.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.components = {}  # FloorComponents per fully labeled floor
+        self.labeling = None  # FloorComponents of the floor being labeled
+        self.paths = OrderedDict()
+
+    def invalidate(self):
+        self.components.clear()
+        self.labeling = None
+        self.paths.clear()
+
+    def update(self, rows=LABEL_ROWS):
+        """Label the next rows of the current floor, if it is not labeled yet"""
+        floor = self.grid.floor
+        if floor in self.components or not self.grid.resident:
+            return
+        if self.labeling is None or self.labeling.floor != floor:
+            self.labeling = FloorComponents(self.grid)
+        if self.labeling.label(rows):
+            self.components[floor] = self.labeling
+            self.labeling = None
+
+    def reach(self, components, x, y):
+        """Components a path can enter or leave cell (x, y) through"""
+        grid = self.grid
+        if not (0 <= x < grid.width and 0 <= y < grid.height):
+            return set()
+        cell = grid.get(x, y)
+        if not BLOCKED[cell]:
+            return {components.component(x, y)}
+        if cell == WALL:
+            return set()
+        # Stairs: through the floor cells next to them
+        return {
+            components.component(x + dx, y + dy) for dx, dy in STEPS
+            if not BLOCKED[grid.get(x + dx, y + dy)]
+        }
+
+    def connected(self, start, goal):
+        """Whether goal can be reached from start, or None while the floor is not labeled yet"""
+        components = self.components.get(self.grid.floor)
+        if components is None:
+            return None
+        if self.grid.get(*goal) != WALL and abs(start[0] - goal[0]) + abs(start[1] - goal[1]) == 1:
+            return True
+        return bool(self.reach(components, *start) & self.reach(components, *goal))
+
+    def path(self, start, goal):
+        """Cells from start (excluded) to goal (included)
+
+        None if the goal cannot be reached, TOO_FAR if the search gave up
+        before finding it (not cached, as the goal may well be reachable).
+        """
+        key = (self.grid.floor, start, goal)
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            return self.paths[key]
+        if self.grid.get(*goal) == WALL or self.connected(start, goal) is False:
+            path = None
+        else:
+            path = self._astar(start, goal)
+            if path is TOO_FAR:
+                return path
+        self.paths[key] = path
+        if len(self.paths) > MAX_CACHED_PATHS:
+            self.paths.popitem(last=False)
+        return path
+
+    def nearest(self, start, accept):
+        """Path to the closest floor cell for which accept(x, y) is true, or None
+
+        Breadth-first, so the search stops as soon as the nearest match is
+        found and never looks further than that.
+        """
+        grid = self.grid
+        came_from = {start: None}
+        queue = deque([start])
+        while queue and len(came_from) < MAX_SEARCH_CELLS:
+            cell = queue.popleft()
+            if cell != start and accept(*cell):
+                return self._walk_back(came_from, cell)
+            x, y = cell
+            for dx, dy in STEPS:
+                neighbor = (x + dx, y + dy)
+                if neighbor not in came_from and not BLOCKED[grid.get(*neighbor)]:
+                    came_from[neighbor] = cell
+                    queue.append(neighbor)
+        return None
+
+    def _astar(self, start, goal):
+        """Shortest path, None if there is none, TOO_FAR after MAX_SEARCH_CELLS cells"""
+        grid = self.grid
+        goal_x, goal_y = goal
+        came_from = {start: None}
+        cost = {start: 0}
+        open_cells = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start)]
+        while open_cells:
+            if len(came_from) >= MAX_SEARCH_CELLS:
+                return TOO_FAR
+            _, steps, cell = heapq.heappop(open_cells)
+            if cell == goal:
+                return self._walk_back(came_from, cell)
+            if steps > cost[cell]:
+                continue
+            x, y = cell
+            for dx, dy in STEPS:
+                neighbor = (x + dx, y + dy)
+                if neighbor != goal and BLOCKED[grid.get(*neighbor)]:
+                    continue
+                if steps + 1 < cost.get(neighbor, steps + 2):
+                    cost[neighbor] = steps + 1
+                    came_from[neighbor] = cell
+                    estimate = steps + 1 + abs(neighbor[0] - goal_x) + abs(neighbor[1] - goal_y)
+                    heapq.heappush(open_cells, (estimate, steps + 1, neighbor))
+        return None
+
+    @staticmethod
+    def _walk_back(came_from, cell):
+        path = []
+        while came_from[cell] is not None:
+            path.append(cell)
+            cell = came_from[cell]
+        path.reverse()
+        return tuple(path)
@@ -0,0 +1,69 @@
+"""Rendering quality that adapts to hold a time budget
+
+The game gives a ``QualityGovernor`` a list of quality levels, best first
+(for the 3D view: ray count and resolution divisor), and tells it how long
+each render took.  Every WINDOW renders it compares the median time with the
+budget: over budget it drops to the next cheaper level, and well under it
+(below HEADROOM of the budget) it moves back up to the better level.  When a
+better level turns out too slow right after moving up to it, the governor
+waits twice as many windows as last time before trying it again, so it
+settles instead of bouncing between two levels.
+"""
+import statistics
+
+WINDOW = 5  # Renders measured before deciding
+HEADROOM = 0.5  # Share of the budget a level must stay under to try the better one
+MAX_BACKOFF = 64  # Most windows waited before trying a better level again
+
+
+class QualityGovernor:
+    """Picks a quality level from measured render times"""
+
+    def __init__(self, levels, budget, level=0, window=WINDOW, headroom=HEADROOM):
+        self.levels = levels  # Best first
+        self.budget = budget  # Seconds a render may take
+        self.level = level
+        self.window = window
+        self.headroom = headroom
+        self.samples = []  # Render times at the current level
+        self.windows = 0  # Windows measured at the current level
+        self.raised = False  # Whether the current level was reached by moving up
+        self.backoff = 1  # Windows to wait after dropping a level
+        self.wait = 0  # Windows left before moving up is allowed
+        self.cost = None  # Median render time of the last window
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    def record(self, seconds):
+        """Add the time one render took; returns True if the level changed"""
+        self.samples.append(seconds)
+        if len(self.samples) < self.window:
+            return False
+        self.cost = statistics.median(self.samples)
+        self.samples = []
+        self.windows += 1
+
+        if self.cost > self.budget and self.level < len(self.levels) - 1:
+            if self.raised and self.windows == 1:
+                # The better level was too slow from the start
+                self.backoff = min(MAX_BACKOFF, self.backoff * 2)
+            else:
+                self.backoff = 1
+            self.wait = self.backoff
+            self.set_level(self.level + 1, False)
+            return True
+        if self.cost < self.budget * self.headroom and self.level > 0:
+            if self.wait > 0:
+                self.wait -= 1
+                return False
+            self.set_level(self.level - 1, True)
+            return True
+        return False
+
+    def set_level(self, level, raised):
+        self.level = level
+        self.raised = raised
+        self.samples = []
+        self.windows = 0
@@ -0,0 +1,252 @@
+import pygame
+
+from dungeon import view_window
+from raycaster import cast_ray, cast_rays_batch, column_rays, SIDE_Y
+from wall_textures import TEXTURE_SIZE, WallStrips, make_brick_texture, texture_column
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it the per-ray loop is used
+    np = None
+
+CEILING_COLOR = (100, 100, 100)
+FLOOR_COLOR = (50, 50, 50)
+
+
+def visible_cells(indices, window, origin):
+    """Map cells for flat indices into a view window, plus the window's center cell"""
+    size = window.width
+    cells = {(origin[0] + i % size, origin[1] + i // size) for i in indices}
+    cells.add((origin[0] + size // 2, origin[1] + size // 2))
+    return tuple(cells)
+
+
+class RaycastView:
+    """First-person view of a dungeon drawn with one ray per strip of columns
+
+    ``render()`` draws the view from a cell and returns the cells the rays
+    passed through or hit (for the auto-map) and the wall distance for every
+    screen column (for drawing sprites).  Walls are flat shaded, or textured
+    from pre-scaled column strips (which needs one ray per screen column).
+    Rays are cast all at once with NumPy when it is installed and
+    ``vectorized`` is set, else one at a time.
+
+    ``num_rays`` and ``scale`` can be changed between renders (see
+    ``set_quality()``); with a scale above 1 the view is rendered at
+    1/scale of the resolution and stretched to fill the surface.
+    """
+
+    def __init__(self, width, height, num_rays, max_depth, plane_length, textured=True, vectorized=True,
+                 side_shade=0.8, ceiling_color=CEILING_COLOR, floor_color=FLOOR_COLOR):
+        self.width = width
+        self.height = height
+        self.num_rays = num_rays
+        self.max_depth = max_depth
+        self.plane_length = plane_length  # Half width of the camera plane
+        self.textured = textured
+        self.vectorized = vectorized
+        self.side_shade = side_shade  # Brightness of north/south wall faces
+        self.ceiling_color = ceiling_color
+        self.floor_color = floor_color
+        # Wall texture pre-scaled to quantized heights, from the farthest wall
+        # (max_depth) to the nearest (half a cell away)
+        self.wall_strips = WallStrips(make_brick_texture(), self.shade, 2 * height / max_depth, 4 * height)
+        # Camera plane positions and screen column -> ray maps per ray count
+        self.ray_layouts = {}
+        self.scale = 1  # Resolution divisor
+        # Views rendered at a lower resolution, and the surfaces they draw to, per scale
+        self.scaled_views = {}
+
+    @property
+    def batched(self):
+        """Whether all rays are cast at once with NumPy"""
+        return self.vectorized and np is not None
+
+    def set_quality(self, num_rays, scale=1):
+        """Cast num_rays rays at 1/scale of the resolution from now on"""
+        self.num_rays = num_rays
+        self.scale = scale
+
+    def shade(self, height, side):
+        """Brightness of a wall height pixels tall"""
+        distance = 2 * self.height / height
+        shade = min(255, max(0, 255 - distance * 30))
+        if side == SIDE_Y:
+            shade *= self.side_shade
+        return shade
+
+    def render(self, surface, grid, x, y, direction):
+        """Draw the view from cell (x, y) facing direction (a unit vector); returns (cells, depth)"""
+        if self.scale > 1:
+            return self.render_scaled(surface, grid, x, y, direction)
+        if self.batched:
+            return self.render_vectorized(surface, grid, x, y, direction)
+
+        width = self.width
+        height = self.height
+        num_rays = self.num_rays
+        max_depth = self.max_depth
+
+        # Camera direction (the way the player faces) and camera plane (to the right)
+        dir_x, dir_y = direction
+        plane_x = -dir_y * self.plane_length
+        plane_y = dir_x * self.plane_length
+
+        # Only the cells rays can reach are needed; rays start from the center
+        # of the player's cell (in window coordinates)
+        window, origin = view_window(grid, x, y, max_depth + 1)
+        pos_x = x - origin[0] + 0.5
+        pos_y = y - origin[1] + 0.5
+        visited = []
+        depth = []
+        heights = []
+        sides = []
+        texture_x = []
+
+        for ray in range(num_rays):
+            # Position on the camera plane (-1 = left edge, 1 = right edge)
+            camera_x = 2 * (ray + 0.5) / num_rays - 1
+
+            # Ray direction vector
+            ray_dir_x = dir_x + plane_x * camera_x
+            ray_dir_y = dir_y + plane_y * camera_x
+
+            # Perpendicular distance to the wall and the side that was hit
+            distance, side = cast_ray(window, pos_x, pos_y, ray_dir_x, ray_dir_y, max_depth, visited)
+
+            # Textured walls are drawn all at once after the loop
+            if self.textured:
+                depth.append(distance)
+                heights.append(2 * height / distance)
+                sides.append(side)
+                texture_x.append(texture_column(pos_x, pos_y, ray_dir_x, ray_dir_y, distance, side))
+                continue
+
+            # Calculate wall height (first wall row and first floor row,
+            # truncated the same way as in render_vectorized())
+            ceiling_y = height / 2 - height / distance
+            ceiling = int(ceiling_y)
+            floor = int(height - ceiling_y)
+
+            # Darken wall color based on distance (north/south faces a bit darker)
+            shade = min(255, max(0, 255 - distance * 30))
+            if side == SIDE_Y:
+                shade *= self.side_shade
+            wall_color = (shade, shade, shade)
+
+            # Column covered by this ray
+            column_x = ray * width // num_rays
+            wall_width = (ray + 1) * width // num_rays - column_x
+            depth.extend([distance] * wall_width)
+
+            # Draw wall
+            wall_rect = pygame.Rect(
+                column_x,
+                ceiling,
+                wall_width,
+                floor - ceiling
+            )
+            pygame.draw.rect(surface, wall_color, wall_rect)
+
+            # Draw floor
+            floor_rect = pygame.Rect(
+                column_x,
+                floor,
+                wall_width,
+                height - floor
+            )
+            pygame.draw.rect(surface, self.floor_color, floor_rect)
+
+            # Draw ceiling
+            ceiling_rect = pygame.Rect(
+                column_x,
+                0,
+                wall_width,
+                ceiling
+            )
+            pygame.draw.rect(surface, self.ceiling_color, ceiling_rect)
+
+        if self.textured:
+            self.draw_textured_walls(surface, heights, sides, texture_x)
+        return visible_cells(visited, window, origin), depth
+
+    def render_scaled(self, surface, grid, x, y, direction):
+        """render() at 1/scale of the resolution, stretched over the surface"""
+        scale = self.scale
+        if scale not in self.scaled_views:
+            view = RaycastView(
+                self.width // scale, self.height // scale, self.num_rays, self.max_depth, self.plane_length,
+                self.textured, self.vectorized, self.side_shade, self.ceiling_color, self.floor_color
+            )
+            # Same pixel format as the surface, as transform.scale() needs
+            self.scaled_views[scale] = (view, pygame.Surface((view.width, view.height), 0, surface))
+        view, small = self.scaled_views[scale]
+        # Textured walls need one ray per column
+        view.num_rays = view.width if self.textured else min(self.num_rays, view.width)
+
+        cells, depth = view.render(small, grid, x, y, direction)
+        pygame.transform.scale(small, (self.width, self.height), surface)
+        # Wall distance for every column of the full-size view
+        return cells, [distance for distance in depth for _ in range(scale)]
+
+    def draw_textured_walls(self, surface, heights, sides, texture_x):
+        """Draw ceiling, floor and one textured wall column per screen column"""
+        width = self.width
+        height = self.height
+        surface.fill(self.ceiling_color, (0, 0, width, height // 2))
+        surface.fill(self.floor_color, (0, height // 2, width, height - height // 2))
+        self.wall_strips.draw(surface, heights, sides, texture_x, height)
+
+    def render_vectorized(self, surface, grid, x, y, direction):
+        """render() with NumPy, written straight into the frame"""
+        width = self.width
+        height = self.height
+        num_rays = self.num_rays
+        if num_rays not in self.ray_layouts:
+            camera_x = 2 * (np.arange(num_rays) + 0.5) / num_rays - 1
+            self.ray_layouts[num_rays] = (camera_x, column_rays(num_rays, width))
+        camera_x, columns = self.ray_layouts[num_rays]
+
+        # Ray direction vectors for every ray at once
+        dir_x, dir_y = direction
+        ray_dir_x = dir_x - dir_y * self.plane_length * camera_x
+        ray_dir_y = dir_y + dir_x * self.plane_length * camera_x
+
+        # Cells within reach of the rays, as an array in window coordinates
+        window, origin = view_window(grid, x, y, self.max_depth + 1)
+        pos_x = x - origin[0] + 0.5
+        pos_y = y - origin[1] + 0.5
+        visited = []
+        distances, sides = cast_rays_batch(
+            window.as_array(), pos_x, pos_y, ray_dir_x, ray_dir_y, self.max_depth, visited
+        )
+        cells = visible_cells(np.unique(np.concatenate(visited)).tolist(), window, origin)
+
+        if self.textured:
+            # Texture column where each ray hit (see wall_textures.texture_column())
+            wall_x = np.where(sides == SIDE_Y, pos_x + ray_dir_x * distances, pos_y + ray_dir_y * distances)
+            texture_x = ((wall_x - np.floor(wall_x)) * TEXTURE_SIZE).astype(int)
+            flip = np.where(sides == SIDE_Y, ray_dir_y < 0, ray_dir_x > 0)
+            texture_x[flip] = TEXTURE_SIZE - 1 - texture_x[flip]
+            self.draw_textured_walls(surface, (2 * height / distances).tolist(), sides.tolist(), texture_x.tolist())
+            return cells, distances.tolist()
+
+        # Wall span and shade per ray, then spread over the screen columns
+        # (first wall row and first floor row, truncated as in render())
+        ceiling_y = height / 2 - height / distances
+        ceiling = ceiling_y.astype(int)[columns]
+        floor = (height - ceiling_y).astype(int)[columns]
+        shade = np.clip(255 - distances * 30, 0, 255)
+        shade[sides == SIDE_Y] *= self.side_shade
+        shade = shade.astype(np.uint8)[columns]
+
+        # Build the whole view as a (width, height, 3) array: ceiling, wall, floor
+        rows = np.arange(height)
+        frame = np.empty((width, height, 3), dtype=np.uint8)
+        frame[:] = shade[:, None, None]
+        frame[rows < ceiling[:, None]] = self.ceiling_color
+        frame[rows >= floor[:, None]] = self.floor_color
+        pygame.surfarray.blit_array(surface, frame)
+
+        return cells, distances[columns].tolist()
+
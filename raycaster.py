@@ -0,0 +1,137 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only cast_rays_batch() needs it
+    np = None
+
+# Which kind of grid line a ray hit
+SIDE_X = 0  # Vertical grid line (east/west face of a wall)
+SIDE_Y = 1  # Horizontal grid line (north/south face of a wall)
+
+
+def cast_ray(grid, pos_x, pos_y, ray_dir_x, ray_dir_y, max_depth, visited=None):
+    """Cast one ray through a DungeonGrid with DDA and return (distance, side)
+
+    The ray advances exactly one cell boundary per step, so the cost depends on
+    how many cells the ray crosses, not on a step resolution.  When the ray
+    direction is built as ``dir + plane * camera_x`` (with a unit ``dir``) the
+    returned distance is the perpendicular distance to the camera plane, so it
+    needs no fisheye correction.  Rays that leave the map or reach
+    ``max_depth`` return ``max_depth``.  If ``visited`` is a list, the flat
+    index (``y * width + x``) of every cell the ray enters, including the
+    wall it hits, is appended to it.
+    """
+    map_x = int(pos_x)
+    map_y = int(pos_y)
+    cells = grid.cells
+    width = grid.width
+    height = grid.height
+
+    # Ray length needed to cross one full cell in x / y
+    delta_x = abs(1 / ray_dir_x) if ray_dir_x else math.inf
+    delta_y = abs(1 / ray_dir_y) if ray_dir_y else math.inf
+
+    # Step direction and ray length to the first cell boundary
+    if ray_dir_x < 0:
+        step_x = -1
+        side_dist_x = (pos_x - map_x) * delta_x
+    else:
+        step_x = 1
+        side_dist_x = (map_x + 1 - pos_x) * delta_x
+    if ray_dir_y < 0:
+        step_y = -1
+        side_dist_y = (pos_y - map_y) * delta_y
+    else:
+        step_y = 1
+        side_dist_y = (map_y + 1 - pos_y) * delta_y
+
+    while True:
+        # Jump to whichever cell boundary is closer
+        if side_dist_x < side_dist_y:
+            distance = side_dist_x
+            side_dist_x += delta_x
+            map_x += step_x
+            side = SIDE_X
+        else:
+            distance = side_dist_y
+            side_dist_y += delta_y
+            map_y += step_y
+            side = SIDE_Y
+
+        if distance >= max_depth:
+            return max_depth, side
+        # Out of map range counts as nothing hit
+        if map_x < 0 or map_x >= width or map_y < 0 or map_y >= height:
+            return max_depth, side
+        index = map_y * width + map_x
+        if visited is not None:
+            visited.append(index)
+        if cells[index] == 1:
+            return distance, side
+
+
+def cast_rays_batch(grid, pos_x, pos_y, ray_dir_x, ray_dir_y, max_depth, visited=None):
+    """Vectorized cast_ray() for arrays of ray directions; returns (distances, sides)
+
+    ``grid`` is a 2D NumPy array indexed ``[y, x]``, such as
+    ``DungeonGrid.as_array()``.  All rays are stepped
+    together, one cell boundary per iteration, and rays drop out of the
+    working set as soon as they hit a wall, leave the map or pass
+    ``max_depth``.  If ``visited`` is a list, an array of the flat indices of
+    the cells entered is appended to it on every step (see cast_ray()).
+    """
+    height, width = grid.shape
+    count = len(ray_dir_x)
+    map_x = np.full(count, int(pos_x))
+    map_y = np.full(count, int(pos_y))
+
+    # Ray length needed to cross one full cell in x / y
+    with np.errstate(divide="ignore"):
+        delta_x = np.abs(1 / ray_dir_x)
+        delta_y = np.abs(1 / ray_dir_y)
+
+    # Step direction and ray length to the first cell boundary
+    step_x = np.where(ray_dir_x < 0, -1, 1)
+    step_y = np.where(ray_dir_y < 0, -1, 1)
+    side_dist_x = np.where(ray_dir_x < 0, pos_x - map_x, map_x + 1 - pos_x) * delta_x
+    side_dist_y = np.where(ray_dir_y < 0, pos_y - map_y, map_y + 1 - pos_y) * delta_y
+    # inf * 0 gives NaN for axis-parallel rays starting on a boundary
+    side_dist_x[np.isinf(delta_x)] = math.inf
+    side_dist_y[np.isinf(delta_y)] = math.inf
+
+    distances = np.full(count, float(max_depth))
+    sides = np.zeros(count, dtype=np.int8)
+    active = np.arange(count)
+
+    while active.size:
+        sdx = side_dist_x[active]
+        sdy = side_dist_y[active]
+
+        # Jump to whichever cell boundary is closer
+        use_x = sdx < sdy
+        distance = np.where(use_x, sdx, sdy)
+        side_dist_x[active] = np.where(use_x, sdx + delta_x[active], sdx)
+        side_dist_y[active] = np.where(use_x, sdy, sdy + delta_y[active])
+        map_x[active] += np.where(use_x, step_x[active], 0)
+        map_y[active] += np.where(use_x, 0, step_y[active])
+        sides[active] = np.where(use_x, SIDE_X, SIDE_Y)
+
+        mx = map_x[active]
+        my = map_y[active]
+        inside = (mx >= 0) & (mx < width) & (my >= 0) & (my < height) & (distance < max_depth)
+        hit = np.zeros(active.size, dtype=bool)
+        hit[inside] = grid[my[inside], mx[inside]] == 1
+        if visited is not None:
+            visited.append(my[inside] * width + mx[inside])
+
+        distances[active[hit]] = distance[hit]
+        active = active[inside & ~hit]
+
+    return distances, sides
+
+
+def column_rays(num_rays, width):
+    """Map every screen column to the index of the ray that draws it"""
+    starts = np.arange(num_rays) * width // num_rays
+    return np.searchsorted(starts, np.arange(width), side="right") - 1
@@ -0,0 +1,202 @@
+"""Record per-frame game actions to a compact binary file and replay them
+
+File layout (all integers little endian):
+
+    header   b"RPLY", version (u8), game name (u8 length + UTF-8),
+             seed (u16 length + UTF-8), action names (u8 count, then
+             u8 length + UTF-8 each)
+    records  frame delta (varint), action count (varint), then per action
+             its index (u8) and, for ARGUMENT_ACTIONS, its arguments (varints)
+    end      frame delta to the last frame (varint), 0
+
+Version 1 files, which stored the action count as a u8, can still be read.
+
+Frames without input are not stored; the frame delta says how many frames
+passed since the previous record.  Because the engines draw every random
+number from generators seeded by the header seed, stepping the same actions
+on the same frames reproduces the session exactly.  Usage:
+
+    python replay.py session.rpl
+"""
+import argparse
+import struct
+import time
+
+MAGIC = b"RPLY"
+VERSION = 2
+
+# Actions stepped as (name, arg, ...) tuples, with their number of integer arguments
+ARGUMENT_ACTIONS = {"walk_to": 2}
+
+
+def write_varint(file, value):
+    """Write a non-negative integer in LEB128 form"""
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            file.write(bytes((byte | 0x80,)))
+        else:
+            file.write(bytes((byte,)))
+            return
+
+
+def read_varint(file):
+    """Read an integer written by write_varint()"""
+    value = 0
+    shift = 0
+    while True:
+        data = file.read(1)
+        if not data:
+            raise ValueError("truncated replay file")
+        value |= (data[0] & 0x7F) << shift
+        if data[0] < 0x80:
+            return value
+        shift += 7
+
+
+def write_string(file, text, size_format):
+    data = text.encode("utf-8")
+    file.write(struct.pack(size_format, len(data)))
+    file.write(data)
+
+
+def read_string(file, size_format):
+    (size,) = struct.unpack(size_format, file.read(struct.calcsize(size_format)))
+    return file.read(size).decode("utf-8")
+
+
+class ReplayRecorder:
+    """Append the actions of every frame to a replay file"""
+
+    def __init__(self, path, game, seed, actions):
+        # seed is None for games without randomness
+        self.file = open(path, "wb")
+        self.index = {name: i for i, name in enumerate(actions)}
+        self.frame = 0
+        self.last_frame = 0
+
+        self.file.write(MAGIC)
+        self.file.write(struct.pack("<B", VERSION))
+        write_string(self.file, game, "<B")
+        write_string(self.file, "" if seed is None else str(seed), "<H")
+        self.file.write(struct.pack("<B", len(actions)))
+        for name in actions:
+            write_string(self.file, name, "<B")
+
+    def record(self, actions):
+        """Log the actions stepped this frame (may be empty)"""
+        self.frame += 1
+        if not actions:
+            return
+        write_varint(self.file, self.frame - self.last_frame)
+        write_varint(self.file, len(actions))
+        for action in actions:
+            if isinstance(action, tuple):
+                self.file.write(bytes((self.index[action[0]],)))
+                for value in action[1:]:
+                    write_varint(self.file, value)
+            else:
+                self.file.write(bytes((self.index[action],)))
+        self.last_frame = self.frame
+
+    def close(self):
+        """Write the end record and close the file"""
+        if self.file.closed:
+            return
+        write_varint(self.file, self.frame - self.last_frame)
+        self.file.write(b"\0")
+        self.file.close()
+
+
+def load(path):
+    """Read a replay file into (game, seed, frames), one action list per frame"""
+    with open(path, "rb") as file:
+        if file.read(4) != MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        (version,) = struct.unpack("<B", file.read(1))
+        if version not in (1, VERSION):
+            raise ValueError(f"unsupported replay version {version}")
+        game = read_string(file, "<B")
+        seed = read_string(file, "<H") or None
+        (count,) = file.read(1)
+        names = [read_string(file, "<B") for _ in range(count)]
+
+        frames = []
+        while True:
+            delta = read_varint(file)
+            if version == 1:
+                (count,) = file.read(1)
+            else:
+                count = read_varint(file)
+            if not count:
+                # The end record only counts the trailing frames without input
+                frames.extend([] for _ in range(delta))
+                break
+            frames.extend([] for _ in range(delta - 1))
+            actions = []
+            for _ in range(count):
+                name = names[file.read(1)[0]]
+                if name in ARGUMENT_ACTIONS:
+                    args = [read_varint(file) for _ in range(ARGUMENT_ACTIONS[name])]
+                    actions.append((name, *args))
+                else:
+                    actions.append(name)
+            frames.append(actions)
+    return game, seed, frames
+
+
+def new_game(game, seed):
+    """Create the headless GameState a replay was recorded with"""
+    if game.startswith("wizardry"):
+        from wizardry_engine import GameState
+        if game == "wizardry":
+            return GameState(seed=seed)
+        _, kind, size = game.split(":", 2)
+        if kind == "file":
+            # Chunked dungeon file, recorded as "wizardry:file:<path>"
+            from chunked_dungeon import ChunkedDungeon
+            return GameState(ChunkedDungeon(size), seed=seed)
+        # Generated dungeon, recorded as "wizardry:<kind>:<size>"
+        from dungeon import generate_rooms, generate_maze
+        generate = generate_rooms if kind == "rooms" else generate_maze
+        return GameState(generate(int(size), int(size), seed), seed=seed)
+    if game == "invaders":
+        from invaders_engine import GameState
+        return GameState()
+    raise ValueError(f"unknown game {game!r}")
+
+
+def describe(game, state):
+    """One-line summary of the final state"""
+    if game.startswith("wizardry"):
+        player = state.player
+        return (f"level {player['level']}, hp {player['hp']}/{player['max_hp']}, "
+                f"exp {player['exp']}, at ({player['x']:.2f}, {player['y']:.2f}) "
+                f"facing {player['direction']}, battle {state.battle_mode}")
+    return f"score {state.score}, enemies left {len(state.formation)}, won {state.won}"
+
+
+def replay(path):
+    """Step a recorded session at uncapped speed; returns (game, state, frames, seconds)"""
+    game, seed, frames = load(path)
+    state = new_game(game, seed)
+    start = time.perf_counter()
+    for actions in frames:
+        state.step(actions)
+    return game, state, len(frames), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session headless.")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    game, state, frames, seconds = replay(args.path)
+    rate = frames / seconds if seconds else float("inf")
+    print(f"{game}: {frames} frames in {seconds:.3f} s ({rate:,.0f} ticks/s)")
+    print(describe(game, state))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import random
+
+
+class RngStreams:
+    """Independent, reproducible random generators for each game subsystem
+
+    Every stream is a ``random.Random`` seeded from (seed, stream name), so
+    drawing more numbers in one subsystem (say, extra damage rolls) never
+    shifts the numbers another subsystem sees, and the same seed always
+    gives the same game.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        self.seed = seed
+        self.streams = {}
+
+    def get(self, name):
+        """Return the generator for name, creating it on first use"""
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = random.Random(f"{self.seed}:{name}")
+            self.streams[name] = stream
+        return stream
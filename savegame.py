@@ -0,0 +1,293 @@
+"""Versioned binary save files for wizardry_engine.GameState
+
+File layout (all integers little endian):
+
+    header     HEADER: magic, version, map kind, sizes, rules, section offsets
+    strings    seed, chunked dungeon path (u16 length + UTF-8 each), then
+               the random stream names (u8 length + UTF-8 each)
+    player     PLAYER: player stats, floor, ticks, battle and enemy,
+               message (u16 length + UTF-8)
+    streams    STREAM per random stream: Mersenne Twister state
+    monsters   monster count (u16), then MONSTER_COUNT MONSTER slots
+    explored   one CellBitset per floor, each at a page-aligned offset
+    map        raw DungeonGrid cells at a page-aligned offset (map kind 0)
+
+Loading maps the explored bitsets and the map copy-on-write instead of
+reading them, so it costs the same for any map size.  A save file is
+written in full once; after that ``Autosaver.save()`` rewrites only the
+player, the random streams, the monsters and the explored bytes that
+changed, in place, so it is cheap enough to run after every step.
+
+Version 2 files (a message of at most 128 bytes without a length) and
+version 1 files (the same, without the monsters section) are read too;
+``save_version()`` tells the game when a file needs writing anew.
+"""
+import mmap
+import os
+import struct
+
+from cell_bitset import CellBitset
+from chunked_dungeon import ChunkedDungeon
+from dungeon import DungeonGrid
+from wizardry_engine import GameState, MONSTER_COUNT
+
+FILE_MAGIC = b"WIZSAVE\0"
+FILE_VERSION = 3
+
+# Map kinds
+MAP_GRID = 0  # Map stored in the save file
+MAP_CHUNKED = 1  # Map read from a chunked dungeon file (path stored)
+
+HEADER = struct.Struct("<8sHBBIIHiiiiddQQQQ")
+MESSAGE_BYTES = 512  # Room for the longest battle messages (three lines)
+PLAYER = struct.Struct(f"<11iHIB16s4iH{MESSAGE_BYTES}s")
+PLAYER_V2 = struct.Struct("<11iHIB16s4i128s")  # Player section of version 1 and 2 files
+STREAM = struct.Struct("<625IBd")
+MONSTER = struct.Struct("<iiB")
+MONSTER_BYTES = 2 + MONSTER.size * MONSTER_COUNT
+
+PLAYER_FIELDS = ("x", "y", "direction", "hp", "max_hp", "mp", "max_mp", "level", "exp", "next_level", "gold")
+ENEMY_FIELDS = ("hp", "attack", "exp", "gold")
+
+
+def align(offset):
+    """Round offset up to where a memory map may start"""
+    granularity = mmap.ALLOCATIONGRANULARITY
+    return -(-offset // granularity) * granularity
+
+
+def pack_string(text, size_format):
+    data = text.encode("utf-8")
+    return struct.pack(size_format, len(data)) + data
+
+
+def unpack_string(data, offset, size_format):
+    (size,) = struct.unpack_from(size_format, data, offset)
+    offset += struct.calcsize(size_format)
+    return data[offset:offset + size].decode("utf-8"), offset + size
+
+
+def parse_seed(text):
+    """Seed stored as text, back as an int if it was one"""
+    try:
+        value = int(text)
+    except ValueError:
+        return text
+    return value if str(value) == text else text
+
+
+def pack_player(state):
+    player = state.player
+    enemy = state.current_enemy
+    message = state.message.encode("utf-8")[:MESSAGE_BYTES]
+    return PLAYER.pack(
+        *(player[field] for field in PLAYER_FIELDS),
+        state.dungeon_map.floor,
+        state.ticks,
+        state.battle_mode,
+        enemy["name"].encode("utf-8") if enemy else b"",
+        *(enemy[field] if enemy else 0 for field in ENEMY_FIELDS),
+        len(message),
+        message,
+    )
+
+
+def pack_streams(state, names):
+    data = bytearray()
+    for name in names:
+        _, internal, gauss = state.rngs.get(name).getstate()
+        data += STREAM.pack(*internal, gauss is not None, gauss or 0.0)
+    return data
+
+
+def pack_monsters(state):
+    data = bytearray(MONSTER_BYTES)
+    struct.pack_into("<H", data, 0, len(state.monsters))
+    for i, monster in enumerate(state.monsters):
+        MONSTER.pack_into(data, 2 + i * MONSTER.size, monster["x"], monster["y"], monster["kind"])
+    return data
+
+
+def unpack_monsters(data, offset):
+    (count,) = struct.unpack_from("<H", data, offset)
+    monsters = []
+    for i in range(count):
+        x, y, kind = MONSTER.unpack_from(data, offset + 2 + i * MONSTER.size)
+        monsters.append({"x": x, "y": y, "kind": kind})
+    return monsters
+
+
+class Layout:
+    """Section offsets of a save file"""
+
+    def __init__(self, state, names):
+        grid = state.dungeon_map
+        self.map_kind = MAP_CHUNKED if isinstance(grid, ChunkedDungeon) else MAP_GRID
+        self.bitset_bytes = len(state.explored[0].bits)
+        self.strings = pack_string(str(state.seed), "<H")
+        self.strings += pack_string(grid.path if self.map_kind == MAP_CHUNKED else "", "<H")
+        for name in names:
+            self.strings += pack_string(name, "<B")
+        self.player_offset = HEADER.size + len(self.strings)
+        self.stream_offset = self.player_offset + PLAYER.size
+        self.monster_offset = self.stream_offset + STREAM.size * len(names)
+        self.explored_offset = align(self.monster_offset + MONSTER_BYTES)
+        self.explored_stride = align(self.bitset_bytes)
+        self.map_offset = self.explored_offset + self.explored_stride * len(state.explored)
+
+
+def save_version(path):
+    """Format version of a save file"""
+    with open(path, "rb") as file:
+        magic, version = struct.unpack("<8sH", file.read(10))
+    if magic != FILE_MAGIC:
+        raise ValueError(f"{path} is not a save file")
+    return version
+
+
+def write_save(path, state):
+    """Write a complete save file for state
+
+    The file is written next to path and then moved over it, so a game
+    loaded from path (whose map and explored cells are mapped from the old
+    file) can be saved back to it.
+    """
+    grid = state.dungeon_map
+    names = list(state.rngs.streams)
+    layout = Layout(state, names)
+    exit_x, exit_y = grid.exit if grid.exit is not None else (-1, -1)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(
+            FILE_MAGIC, FILE_VERSION, layout.map_kind, len(names),
+            grid.width, grid.height, len(state.explored),
+            *grid.start, exit_x, exit_y,
+            state.encounter_rate, state.next_level_factor,
+            layout.player_offset, layout.stream_offset, layout.explored_offset, layout.map_offset,
+        ))
+        file.write(layout.strings)
+        file.write(pack_player(state))
+        file.write(pack_streams(state, names))
+        file.write(pack_monsters(state))
+        for floor, explored in enumerate(state.explored):
+            file.seek(layout.explored_offset + floor * layout.explored_stride)
+            file.write(explored.bits)
+            explored.take_dirty()
+        if layout.map_kind == MAP_GRID:
+            file.seek(layout.map_offset)
+            file.write(grid.cells)
+        else:
+            # Pad so every explored bitset can be mapped in full
+            file.truncate(layout.map_offset)
+    os.replace(temp_path, path)
+
+
+def map_section(file, offset, size):
+    """Copy-on-write memory map of part of the file"""
+    return mmap.mmap(file.fileno(), size, offset=offset, access=mmap.ACCESS_COPY)
+
+
+def load_game(path):
+    """Load a save file and return the GameState it holds"""
+    with open(path, "rb") as file:
+        head = file.read(HEADER.size)
+        (magic, version, map_kind, stream_count, width, height, floors,
+         start_x, start_y, exit_x, exit_y, encounter_rate, next_level_factor,
+         player_offset, stream_offset, explored_offset, map_offset) = HEADER.unpack(head)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a save file")
+        if version not in (1, 2, FILE_VERSION):
+            raise ValueError(f"unsupported save version {version}")
+        data = head + file.read(explored_offset - HEADER.size)
+
+        seed, offset = unpack_string(data, HEADER.size, "<H")
+        dungeon_path, offset = unpack_string(data, offset, "<H")
+        names = []
+        for _ in range(stream_count):
+            name, offset = unpack_string(data, offset, "<B")
+            names.append(name)
+
+        # The map: mapped from this file, or streamed from the dungeon file
+        if map_kind == MAP_GRID:
+            cells = map_section(file, map_offset, width * height)
+            grid = DungeonGrid(width, height, start=(start_x, start_y), cells=cells)
+            grid.exit = (exit_x, exit_y) if exit_x >= 0 else None
+        else:
+            grid = ChunkedDungeon(dungeon_path)
+
+        state = GameState(grid, seed=parse_seed(seed), encounter_rate=encounter_rate, next_level_factor=next_level_factor)
+
+        # Player, battle and message
+        values = (PLAYER if version == FILE_VERSION else PLAYER_V2).unpack_from(data, player_offset)
+        state.player.update(zip(PLAYER_FIELDS, values[:11]))
+        floor, state.ticks, battle_mode, enemy_name = values[11:15]
+        grid.floor = floor
+        state.battle_mode = bool(battle_mode)
+        if enemy_name.rstrip(b"\0"):
+            state.current_enemy = {"name": enemy_name.rstrip(b"\0").decode("utf-8")}
+            state.current_enemy.update(zip(ENEMY_FIELDS, values[15:19]))
+        if version == FILE_VERSION:
+            message = values[20][:values[19]]
+        else:
+            message = values[19].rstrip(b"\0")
+        state.message = message.decode("utf-8", "ignore")
+
+        # Random streams continue exactly where they were saved
+        for i, name in enumerate(names):
+            values = STREAM.unpack_from(data, stream_offset + i * STREAM.size)
+            gauss = values[626] if values[625] else None
+            state.rngs.get(name).setstate((3, values[:625], gauss))
+        # Version 1 files have no monsters; new ones spawn around the player
+        if version >= 2:
+            state.monsters = unpack_monsters(data, stream_offset + stream_count * STREAM.size)
+
+        # Explored cells
+        bitset_bytes = (width * height + 7) // 8
+        stride = align(bitset_bytes)
+        state.explored = [
+            CellBitset(width, height, map_section(file, explored_offset + floor * stride, bitset_bytes))
+            for floor in range(floors)
+        ]
+    return state
+
+
+class Autosaver:
+    """Save file kept open for cheap in-place saves of a running game
+
+    Only the parts that change while playing are rewritten: the player
+    section, the random streams, the monsters and the explored bytes
+    touched since the last save.  The map is never written again.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "r+b")
+        header = HEADER.unpack(self.file.read(HEADER.size))
+        if header[1] != FILE_VERSION:
+            raise ValueError(f"save version {header[1]} must be written anew before autosaving")
+        self.player_offset, self.stream_offset, self.explored_offset, map_offset = header[-4:]
+        data = self.file.read(self.player_offset - HEADER.size)
+        _, offset = unpack_string(data, 0, "<H")
+        _, offset = unpack_string(data, offset, "<H")
+        self.names = []
+        for _ in range(header[3]):
+            name, offset = unpack_string(data, offset, "<B")
+            self.names.append(name)
+        width, height = header[4], header[5]
+        self.explored_stride = align((width * height + 7) // 8)
+        self.saves = 0
+
+    def save(self, state):
+        """Write the changed parts of state to the save file"""
+        self.file.seek(self.player_offset)
+        self.file.write(pack_player(state) + pack_streams(state, self.names) + pack_monsters(state))
+        for floor, explored in enumerate(state.explored):
+            dirty = explored.take_dirty()
+            if dirty is not None:
+                start, end = dirty
+                self.file.seek(self.explored_offset + floor * self.explored_stride + start)
+                self.file.write(explored.bits[start:end])
+        self.file.flush()
+        self.saves += 1
+
+    def close(self):
+        self.file.close()
@@ -1,147 +1,203 @@
+import argparse
+import contextlib
 import pygame
-import random
 import sys
 
+from invaders_engine import GameState, ACTIONS, TICK_RATE, WIDTH, HEIGHT, BLACK, WHITE
+from fixed_timestep import FixedTimestep, lerp
+from replay import ReplayRecorder
+from text_cache import get_font, render_text
+from frame_profiler import profiler
+
+# コマンドライン引数
+parser = argparse.ArgumentParser(description="Something like Space Invaders")
+parser.add_argument("--record", metavar="PATH", help="record the input to a replay file")
+parser.add_argument("--profile", metavar="PATH",
+                    help="start with the frame profiler on and write its timings to PATH (.csv or .json trace)")
+parser.add_argument("--fps", type=int, default=60,
+                    help=f"draw at most FPS frames per second, 0 for no limit (the game always runs at {TICK_RATE} steps per second)")
+args = parser.parse_args()
+
 # 初期化
 pygame.init()
 
 # 画面設定
-WIDTH, HEIGHT = 800, 600
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Something like Space Invaders")
 
-# 色の定義
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-GREEN = (0, 255, 0)
-RED = (255, 0, 0)
-
-# プレイヤークラス
-class Player(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        self.image = pygame.Surface((50, 30))
-        self.image.fill(GREEN)
-        self.rect = self.image.get_rect()
-        self.rect.centerx = WIDTH // 2
-        self.rect.bottom = HEIGHT - 10
-        self.speed = 8
-
-    def update(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] and self.rect.left > 0:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.rect.right < WIDTH:
-            self.rect.x += self.speed
-
-    def shoot(self):
-        bullet = Bullet(self.rect.centerx, self.rect.top)
-        all_sprites.add(bullet)
-        bullets.add(bullet)
-
-# 敵クラス
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((40, 40))
-        self.image.fill(RED)
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-        self.speed = 2
-        self.direction = 1
-
-    def update(self):
-        self.rect.x += self.speed * self.direction
-
-# 弾クラス
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((5, 10))
-        self.image.fill(WHITE)
-        self.rect = self.image.get_rect()
-        self.rect.centerx = x
-        self.rect.bottom = y
-        self.speed = -10
-
-    def update(self):
-        self.rect.y += self.speed
-        if self.rect.bottom < 0:
-            self.kill()
-
-# スプライトグループの作成
-all_sprites = pygame.sprite.Group()
-enemies = pygame.sprite.Group()
-bullets = pygame.sprite.Group()
-
-# プレイヤーの作成
-player = Player()
-all_sprites.add(player)
-
-# 敵の作成
-for row in range(5):
-    for column in range(8):
-        enemy = Enemy(100 + column * 70, 50 + row * 50)
-        all_sprites.add(enemy)
-        enemies.add(enemy)
+# 変化した領域だけを画面に転送する（ダーティ矩形モード）
+DIRTY_RECTS = False
+
+# フォント（起動時に一度だけ読み込む）
+score_font = get_font(None, 36)
+win_font = get_font(None, 74)
+
+# ゲームの状態（ロジックは invaders_engine にある）
+state = GameState()
+formation = state.formation
+all_sprites = state.all_sprites
+
+# 入力の記録（replay.py で再生できる。乱数は使わないのでシードは不要）
+recorder = ReplayRecorder(args.record, "invaders", None, ACTIONS) if args.record else None
+
+# フレームプロファイラ（F3 で表示を切り替える）
+PROFILER_KEY = pygame.K_F3
+if args.profile:
+    profiler.toggle()
+
+# 補間描画
+# 各ステップの前の位置を覚えておき、描画のときは前のステップと今の位置の間に置く
+def positions():
+    """編隊のオフセットと各スプライトの位置"""
+    return (formation.offset_x, formation.offset_y), {sprite: sprite.rect.topleft for sprite in all_sprites}
+
+@contextlib.contextmanager
+def interpolated(previous, alpha):
+    """描画の間だけ、編隊とスプライトを前のステップとの間の位置に動かす"""
+    current = positions()
+    (offset_x, offset_y), previous_positions = previous
+    formation.offset_x = round(lerp(offset_x, formation.offset_x, alpha))
+    formation.offset_y = round(lerp(offset_y, formation.offset_y, alpha))
+    for sprite in all_sprites:
+        # 撃ったばかりの弾は今の位置のまま
+        if sprite in previous_positions:
+            x, y = previous_positions[sprite]
+            sprite.rect.topleft = (round(lerp(x, sprite.rect.x, alpha)), round(lerp(y, sprite.rect.y, alpha)))
+    try:
+        yield
+    finally:
+        (formation.offset_x, formation.offset_y), current_positions = current
+        for sprite, position in current_positions.items():
+            sprite.rect.topleft = position
 
 # ゲームループ
+# ゲームは固定の間隔（1/TICK_RATE 秒）のステップで進め、描画はその間に最大 --fps 回行う
+# 描画が遅れたときは何ステップかまとめて進める（フレームスキップ）
 clock = pygame.time.Clock()
-score = 0
+timestep = FixedTimestep(TICK_RATE)
+pending = []  # 次のステップで行う操作（キーを押した回数分の "shoot"）
+previous = positions()
+formation_rect = formation.bounds()
 game_over = False
+score_text = None
+score_rect = None
+drawn_score = None
+
+# ダーティ矩形モードで消去に使う背景
+background = pygame.Surface((WIDTH, HEIGHT))
+background.fill(BLACK)
+screen.blit(background, (0, 0))
+pygame.display.flip()
 
 while not game_over:
-    # イベント処理
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
+    profiler.begin_frame()
+    redraw_all = False
+
+    # イベント処理（キー入力を操作に変換する）
+    with profiler.section("events"):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game_over = True
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    pending.append("shoot")
+                elif event.key == PROFILER_KEY:
+                    # オーバーレイが消えた跡も含めて画面全体を描き直す
+                    profiler.toggle()
+                    redraw_all = True
+        keys = pygame.key.get_pressed()
+        held = []
+        if keys[pygame.K_LEFT]:
+            held.append("left")
+        if keys[pygame.K_RIGHT]:
+            held.append("right")
+
+    # 更新処理（前のフレームから経った時間の分だけステップを進める）
+    for _ in range(timestep.advance()):
+        actions = pending + held
+        pending = []
+        previous = positions()
+        state.step(actions)
+        if recorder:
+            recorder.record(actions)
+        if state.game_over:
             game_over = True
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                player.shoot()
-
-    # 更新処理
-    all_sprites.update()
-
-    # 敵の移動方向の変更
-    for enemy in enemies:
-        if enemy.rect.right >= WIDTH or enemy.rect.left <= 0:
-            for e in enemies:
-                e.direction *= -1
-                e.rect.y += 20
             break
-
-    # 弾と敵の衝突判定
-    hits = pygame.sprite.groupcollide(bullets, enemies, True, True)
-    for hit in hits:
-        score += 10
-
-    # 敵がプレイヤーに到達したらゲームオーバー
-    for enemy in enemies:
-        if enemy.rect.bottom >= HEIGHT - 30:
-            game_over = True
+    score = state.score
 
     # 敵がすべていなくなったら勝利
-    if len(enemies) == 0:
-        font = pygame.font.SysFont(None, 74)
-        text = font.render("You Win!", True, WHITE)
+    if state.won:
+        text = render_text(win_font, "You Win!", WHITE)
         screen.blit(text, (WIDTH//2 - 100, HEIGHT//2 - 30))
         pygame.display.flip()
         pygame.time.wait(2000)
         game_over = True
 
-    # 描画処理
-    screen.fill(BLACK)
-    all_sprites.draw(screen)
+    # 描画処理（前のステップから経った時間の分だけ位置を補間する）
+    with profiler.section("draw"), interpolated(previous, timestep.alpha):
+        if DIRTY_RECTS:
+            # 前のフレームのスプライトを背景で消してから描き直す
+            if redraw_all:
+                screen.blit(background, (0, 0))
+                drawn_score = None
+            else:
+                all_sprites.clear(screen, background)
+                screen.blit(background, formation_rect, formation_rect)
+            formation.draw(screen)
+            dirty = all_sprites.draw(screen)
+            dirty.append(formation_rect)
+            formation_rect = formation.bounds()
+            if len(formation) > 0:
+                dirty.append(formation_rect)
+            if redraw_all:
+                dirty.append(screen.get_rect())
+        else:
+            screen.fill(BLACK)
+            formation.draw(screen)
+            all_sprites.draw(screen)
+        
+        # スコア表示（スコアが変わったときだけ描き直す）
+        score_area = score_rect
+        score_changed = score != drawn_score
+        if score_changed:
+            score_text = render_text(score_font, f"Score: {score}", WHITE)
+            score_rect = score_text.get_rect(topleft=(10, 10))
+            score_area = score_rect.union(score_area) if score_area else score_rect
+            drawn_score = score
+        
+        if DIRTY_RECTS:
+            # スコアが変わったかスプライトが重なったときは、その部分を作り直す
+            if score_changed or score_rect.collidelist(dirty) != -1:
+                screen.set_clip(score_area)
+                screen.blit(background, score_area, score_area)
+                formation.draw(screen)
+                for sprite in all_sprites:
+                    if sprite.rect.colliderect(score_area):
+                        screen.blit(sprite.image, sprite.rect)
+                screen.blit(score_text, score_rect)
+                screen.set_clip(None)
+                dirty.append(score_area)
+        else:
+            screen.blit(score_text, score_rect)
     
-    # スコア表示
-    font = pygame.font.SysFont(None, 36)
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    screen.blit(score_text, (10, 10))
+    # 処理時間の表示（毎フレーム変わる）
+    if profiler.enabled:
+        overlay = profiler.draw(screen, (WIDTH - 10, 10))
+        if DIRTY_RECTS:
+            dirty.append(overlay)
     
-    pygame.display.flip()
-    clock.tick(60)
+    with profiler.section("display.flip"):
+        if DIRTY_RECTS:
+            pygame.display.update(dirty)
+        else:
+            pygame.display.flip()
+    profiler.end_frame()
+    clock.tick(args.fps)
 
 # ゲーム終了
+if args.profile:
+    profiler.write(args.profile)
+if recorder:
+    recorder.close()
 pygame.quit()
 sys.exit()
@@ -0,0 +1,90 @@
+class SpatialHash:
+    """Uniform grid that buckets items by the cells their rectangles overlap
+
+    Inserting, moving and removing an item only touches the few cells its
+    rectangle covers, and ``query()`` returns just the items sharing a cell
+    with the given rectangle, so finding collision candidates does not
+    depend on the total number of items.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.item_cells = {}
+
+    def _cells_for(self, rect):
+        size = self.cell_size
+        return [
+            (cell_x, cell_y)
+            for cell_y in range(rect.top // size, (rect.bottom - 1) // size + 1)
+            for cell_x in range(rect.left // size, (rect.right - 1) // size + 1)
+        ]
+
+    def insert(self, item, rect):
+        """Add item covering rect"""
+        keys = self._cells_for(rect)
+        self.item_cells[item] = keys
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket is None:
+                self.cells[key] = {item: None}
+            else:
+                bucket[item] = None
+
+    def remove(self, item):
+        """Remove item; does nothing if it is not in the hash"""
+        for key in self.item_cells.pop(item, ()):
+            bucket = self.cells[key]
+            del bucket[item]
+            if not bucket:
+                del self.cells[key]
+
+    def move(self, item, rect):
+        """Update the cells of an item whose rectangle changed"""
+        if self.item_cells.get(item) != self._cells_for(rect):
+            self.remove(item)
+            self.insert(item, rect)
+
+    def query(self, rect):
+        """Return the items sharing at least one cell with rect, in insertion order"""
+        found = {}
+        for key in self._cells_for(rect):
+            bucket = self.cells.get(key)
+            if bucket:
+                found.update(bucket)
+        return list(found)
+
+    def clear(self):
+        """Remove every item"""
+        self.cells.clear()
+        self.item_cells.clear()
+
+    def __len__(self):
+        return len(self.item_cells)
+
+
+def groupcollide(group_a, group_b, dokill_a, dokill_b, cell_size=64):
+    """pygame.sprite.groupcollide() with a spatial hash broad phase
+
+    Returns the same ``{sprite_a: [sprites_b...]}`` dictionary and kills
+    sprites the same way: with ``dokill_b`` a sprite of group_b that has
+    been hit can not be hit again by a later sprite of group_a.
+    """
+    grid = SpatialHash(cell_size)
+    for sprite in group_b:
+        grid.insert(sprite, sprite.rect)
+
+    crashed = {}
+    for sprite_a in group_a.sprites():
+        rect = sprite_a.rect
+        collided = [sprite_b for sprite_b in grid.query(rect) if rect.colliderect(sprite_b.rect)]
+        if not collided:
+            continue
+        crashed[sprite_a] = collided
+        if dokill_a:
+            sprite_a.kill()
+        if dokill_b:
+            for sprite_b in collided:
+                sprite_b.kill()
+                grid.remove(sprite_b)
+    return crashed
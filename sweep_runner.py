@@ -0,0 +1,185 @@
+"""Run many full dungeon playthroughs in parallel for tuning
+
+Every combination of encounter rate and level curve factor is played
+--runs times by a simple scripted player, spread over worker processes.
+Each run's game is seeded from (--seed, run index), so results do not
+depend on how runs are split across workers.  Rows are appended to a
+columnar file as chunks finish.
+
+Run with: python sweep_runner.py --runs 1000 --encounter-rates 0.1 0.2 0.3 --level-factors 1.3 1.5 2.0
+"""
+import argparse
+import json
+import os
+import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from wizardry_engine import GameState, spells
+
+# Columns written for every run, with their array typecodes
+COLUMNS = [
+    ("run", "q"),
+    ("encounter_rate", "d"),
+    ("level_factor", "d"),
+    ("ticks", "q"),
+    ("battles", "q"),
+    ("victories", "q"),
+    ("level", "q"),
+    ("exp", "q"),
+    ("gold", "q"),
+    ("defeated", "b")
+]
+
+FILE_MAGIC = b"SWEEPCOL"
+BATCH_HEADER = struct.Struct("<I")
+
+
+class ColumnWriter:
+    """Append-only columnar file: a JSON schema line, then batches of columns
+
+    Each batch is a little-endian uint32 row count followed by every column's
+    values as one packed array, so a reader can pull a single column without
+    touching the others.
+    """
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.file = open(path, "wb")
+        schema = json.dumps([[name, code] for name, code in columns]).encode()
+        self.file.write(FILE_MAGIC + schema + b"\n")
+        self.rows = 0
+
+    def write_batch(self, batch):
+        """Write a dict of column name -> list of values"""
+        count = len(batch[self.columns[0][0]])
+        self.file.write(BATCH_HEADER.pack(count))
+        for name, code in self.columns:
+            self.file.write(array(code, batch[name]).tobytes())
+        self.rows += count
+
+    def close(self):
+        self.file.close()
+
+
+def read_columns(path):
+    """Read a file written by ColumnWriter into a dict of arrays"""
+    with open(path, "rb") as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} is not a sweep column file")
+        columns = json.loads(f.readline())
+        data = {name: array(code) for name, code in columns}
+        while True:
+            header = f.read(BATCH_HEADER.size)
+            if not header:
+                break
+            (count,) = BATCH_HEADER.unpack(header)
+            for name, code in columns:
+                column = data[name]
+                column.frombytes(f.read(count * column.itemsize))
+    return data
+
+
+def choose_action(state, rng):
+    """Scripted player: wander the dungeon, fight with the best affordable spell"""
+    if state.battle_mode:
+        player = state.player
+        for i in reversed(range(len(spells))):
+            spell = spells[i]
+            if player["level"] >= spell["level_req"] and player["mp"] >= spell["mp_cost"]:
+                return f"spell_{i + 1}"
+        return "attack"
+    roll = rng.random()
+    if roll < 0.7:
+        return "forward"
+    return "turn_left" if roll < 0.85 else "turn_right"
+
+
+def play(run, seed, encounter_rate, level_factor, max_ticks):
+    """Play one run until defeat or max_ticks and return its result row"""
+    state = GameState(seed=f"{seed}:{run}", encounter_rate=encounter_rate, next_level_factor=level_factor)
+    rng = state.rngs.get("policy")
+    battles = 0
+    victories = 0
+    while state.ticks < max_ticks and not state.defeated:
+        was_in_battle = state.battle_mode
+        state.step([choose_action(state, rng)])
+        if state.battle_mode and not was_in_battle:
+            battles += 1
+        elif was_in_battle and not state.battle_mode:
+            victories += 1
+    player = state.player
+    return (run, encounter_rate, level_factor, state.ticks, battles, victories,
+            player["level"], player["exp"], player["gold"], state.defeated)
+
+
+def play_chunk(first_run, count, seed, encounter_rate, level_factor, max_ticks):
+    """Worker entry point: play runs first_run .. first_run + count - 1"""
+    batch = {name: [] for name, code in COLUMNS}
+    for run in range(first_run, first_run + count):
+        row = play(run, seed, encounter_rate, level_factor, max_ticks)
+        for (name, code), value in zip(COLUMNS, row):
+            batch[name].append(value)
+    return batch
+
+
+def sweep(path, encounter_rates, level_factors, runs, max_ticks, seed, workers, chunk_size):
+    """Run the whole sweep, streaming batches to path; returns per-setting totals"""
+    writer = ColumnWriter(path, COLUMNS)
+    totals = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            run = 0
+            for encounter_rate in encounter_rates:
+                for level_factor in level_factors:
+                    for first in range(0, runs, chunk_size):
+                        count = min(chunk_size, runs - first)
+                        futures.append(pool.submit(
+                            play_chunk, run + first, count, seed, encounter_rate, level_factor, max_ticks
+                        ))
+                    run += runs
+            for future in as_completed(futures):
+                batch = future.result()
+                writer.write_batch(batch)
+                # Keep running sums so the summary never needs the whole file
+                key = (batch["encounter_rate"][0], batch["level_factor"][0])
+                total = totals.setdefault(key, [0, 0, 0, 0])
+                total[0] += len(batch["run"])
+                total[1] += sum(batch["level"])
+                total[2] += sum(batch["gold"])
+                total[3] += sum(batch["defeated"])
+    finally:
+        writer.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200, help="runs per setting")
+    parser.add_argument("--ticks", type=int, default=2000, help="max steps per run")
+    parser.add_argument("--encounter-rates", type=float, nargs="+", default=[0.2])
+    parser.add_argument("--level-factors", type=float, nargs="+", default=[1.5])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=50, help="runs per worker task")
+    parser.add_argument("--out", default="sweep.col")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    totals = sweep(
+        args.out, args.encounter_rates, args.level_factors, args.runs,
+        args.ticks, args.seed, args.workers, args.chunk_size
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"{'encounter':>9} {'factor':>6} {'avg level':>9} {'avg gold':>9} {'defeated':>8}")
+    for (encounter_rate, level_factor), (count, levels, gold, defeated) in sorted(totals.items()):
+        print(f"{encounter_rate:>9.2f} {level_factor:>6.2f} {levels / count:>9.2f} {gold / count:>9.1f} {defeated / count * 100:>7.1f}%")
+    runs = sum(total[0] for total in totals.values())
+    print(f"{runs} runs in {elapsed:.2f} s, results in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
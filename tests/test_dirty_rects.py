@@ -0,0 +1,50 @@
+import os
+import sys
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame
+import frame_profiler
+from dirty_rects import RegionTracker
+from frame_profiler import FrameProfiler
+
+pygame.init()
+
+SIZE = (400, 300)
+BACKGROUND = (0, 0, 160)
+
+
+def test_overlay_matches_full_redraw(monkeypatch):
+    screen = pygame.Surface(SIZE)
+    # The display only gets the rectangles passed to update()
+    shown = pygame.Surface(SIZE)
+    monkeypatch.setattr(pygame.display, "update", lambda rects: [shown.blit(screen, rect, rect) for rect in rects])
+    monkeypatch.setattr(frame_profiler, "STATS_INTERVAL", 1)  # New numbers every frame
+    profiler = FrameProfiler(frames=10, enabled=True)
+    tracker = RegionTracker()
+
+    def draw_frame():
+        screen.fill(BACKGROUND)
+
+    def draw_overlay():
+        return profiler.draw(screen, (SIZE[0] - 10, 10))
+
+    # The overlay grows by a row per frame, is hidden and shown again, then
+    # shrinks as the extra sections drop out of the profiler's frames
+    sections = [1, 2, 3, 4, 5, 6, 6, 6] + [1] * 20
+    for frame, count in enumerate(sections):
+        if frame in (8, 10):
+            profiler.toggle()
+        profiler.begin_frame()
+        for i in range(count):
+            with profiler.section(f"section{i}"):
+                pass
+        tracker.check("background", BACKGROUND, screen.get_rect())
+        tracker.draw(screen, draw_frame, draw_overlay if profiler.enabled else None)
+        tracker.present()
+
+        full = pygame.Surface(SIZE)
+        full.fill(BACKGROUND)
+        if profiler.enabled:
+            profiler.draw(full, (SIZE[0] - 10, 10))
+        assert pygame.image.tobytes(shown, "RGB") == pygame.image.tobytes(full, "RGB"), f"frame {frame}"
+        profiler.end_frame()
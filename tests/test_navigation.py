@@ -0,0 +1,25 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chunked_dungeon import ChunkedDungeon, write_dungeon
+from dungeon import generate_rooms
+from navigation import NavIndex, TOO_FAR
+
+
+def test_chunked_map_is_not_labeled(tmp_path):
+    # Labeling would read every chunk of the floor through the small LRU
+    grid = generate_rooms(256, 256, seed=1)
+    path = str(tmp_path / "dungeon.dat")
+    write_dungeon(path, grid.width, grid.height, 1, [grid], chunk_size=16)
+    dungeon = ChunkedDungeon(path, max_chunks=8)
+    nav = NavIndex(dungeon)
+    for _ in range(grid.height):
+        nav.update()
+    assert dungeon.loads == 0
+    assert nav.connected(grid.start, grid.exit) is None
+
+    # Paths are still found, by the bounded search alone
+    route = nav.path(grid.start, grid.exit)
+    assert route not in (None, TOO_FAR)
+    assert route == NavIndex(grid).path(grid.start, grid.exit)
+    dungeon.close()
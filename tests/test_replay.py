@@ -0,0 +1,31 @@
+import os
+import struct
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from replay import MAGIC, ReplayRecorder, load
+
+ACTIONS = ["forward", "turn_left", "walk_to"]
+
+
+@pytest.mark.parametrize("count", [255, 256, 1000])
+def test_many_actions_in_one_tick(tmp_path, count):
+    # Past 255 actions the count no longer fits in one byte
+    path = str(tmp_path / "session.rpl")
+    actions = [("walk_to", i, i + 1) if i % 2 else "forward" for i in range(count)]
+    recorder = ReplayRecorder(path, "wizardry", 1, ACTIONS)
+    recorder.record([])
+    recorder.record(actions)
+    recorder.record(["turn_left"])
+    recorder.close()
+    assert load(path) == ("wizardry", "1", [[], actions, ["turn_left"]])
+
+
+def test_version_1_file(tmp_path):
+    # Version 1 stored the action count as a u8 (200 would read as the start of a varint)
+    path = tmp_path / "session.rpl"
+    data = MAGIC + struct.pack("<BB", 1, 8) + b"wizardry" + struct.pack("<H", 1) + b"1"
+    data += bytes([len(ACTIONS)]) + b"".join(bytes([len(name)]) + name.encode() for name in ACTIONS)
+    data += bytes([1, 200]) + bytes([1]) * 200 + bytes([1, 0])
+    path.write_bytes(data)
+    assert load(str(path)) == ("wizardry", "1", [["turn_left"] * 200, []])
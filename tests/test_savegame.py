@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dungeon import generate_rooms
+from savegame import load_game, write_save
+from wizardry_engine import GameState
+
+
+def test_floor_cells_of_loaded_game(tmp_path):
+    # A loaded map is a memory map of the save file, not a bytearray
+    grid = generate_rooms(32, 32, seed=1)
+    path = str(tmp_path / "game.sav")
+    write_save(path, GameState(grid, seed=1))
+    loaded = load_game(path).dungeon_map
+    assert list(loaded.floor_cells()) == list(grid.floor_cells())
@@ -0,0 +1,60 @@
+import collections
+
+import pygame
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces
+
+    Surfaces are keyed by (font, text, color, antialias), so drawing the same
+    string again is a dictionary lookup instead of a new rasterization.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Return font.render(text, antialias, color), cached"""
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Drop every cached surface"""
+        self.surfaces.clear()
+
+
+# Cache shared by all drawing code
+text_cache = TextCache()
+
+
+def render_text(font, text, color, antialias=True):
+    """Render text through the shared text cache"""
+    return text_cache.render(font, text, color, antialias)
+
+
+# Fonts loaded so far, keyed by (name, size)
+fonts = {}
+
+
+def get_font(name, size):
+    """Return the SysFont for (name, size), loading it only on first use"""
+    key = (name, size)
+    font = fonts.get(key)
+    if font is None:
+        font = pygame.font.SysFont(name, size)
+        fonts[key] = font
+    return font
@@ -0,0 +1,85 @@
+import collections
+
+import pygame
+
+
+class ViewCache:
+    """LRU cache of rendered 3D views keyed by (x, y, direction)
+
+    Views are rendered on first use by ``render(surface, key)`` and kept until
+    the total size of the cached surfaces would exceed ``max_bytes``, at which
+    point the least recently used views are dropped.  Whatever ``render``
+    returns (e.g. the cells the view shows) is kept with the view and can be
+    read back with ``info(key)``.
+    """
+
+    def __init__(self, size, render, max_bytes):
+        self.size = size
+        self.render = render
+        self.max_bytes = max_bytes
+        self.views = collections.OrderedDict()
+        self.infos = {}
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the view for key, rendering it if it is not cached"""
+        view = self.views.get(key)
+        if view is not None:
+            self.views.move_to_end(key)
+            self.hits += 1
+            return view
+
+        self.misses += 1
+        view, info = self._render(key)
+        self._store(key, view, info)
+        return view
+
+    def info(self, key):
+        """What render() returned for a cached view, or None"""
+        return self.infos.get(key)
+
+    def prefill(self, keys):
+        """Render views ahead of time until the memory cap is reached"""
+        for key in keys:
+            if key in self.views:
+                continue
+            view, info = self._render(key)
+            if self.bytes_used + self._view_bytes(view) > self.max_bytes:
+                break
+            self._store(key, view, info)
+
+    def discard(self, key):
+        """Drop one cached view, so the next get() renders it again"""
+        view = self.views.pop(key, None)
+        if view is not None:
+            del self.infos[key]
+            self.bytes_used -= self._view_bytes(view)
+
+    def clear(self):
+        """Drop every cached view (e.g. after the map has changed)"""
+        self.views.clear()
+        self.infos.clear()
+        self.bytes_used = 0
+
+    def _render(self, key):
+        view = pygame.Surface(self.size)
+        # Match the display format so blitting the view is a plain copy
+        if pygame.display.get_surface() is not None:
+            view = view.convert()
+        return view, self.render(view, key)
+
+    def _store(self, key, view, info):
+        self.views[key] = view
+        self.infos[key] = info
+        self.bytes_used += self._view_bytes(view)
+        # Evict least recently used views, but always keep the newest one
+        while self.bytes_used > self.max_bytes and len(self.views) > 1:
+            old_key, old = self.views.popitem(last=False)
+            del self.infos[old_key]
+            self.bytes_used -= self._view_bytes(old)
+
+    @staticmethod
+    def _view_bytes(view):
+        return view.get_bytesize() * view.get_width() * view.get_height()
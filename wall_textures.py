@@ -0,0 +1,128 @@
+import math
+
+import pygame
+
+from raycaster import SIDE_X, SIDE_Y
+
+TEXTURE_SIZE = 64
+HEIGHT_STEP = 1.05  # Size ratio between neighboring pre-scaled heights
+
+
+def make_brick_texture(size=TEXTURE_SIZE, brick=(200, 200, 200), mortar=(110, 110, 110)):
+    """Stone brick texture drawn in code (the game ships no image files)"""
+    texture = pygame.Surface((size, size))
+    texture.fill(mortar)
+    rows = 4
+    brick_height = size // rows
+    brick_width = size // 2
+    for row in range(rows):
+        # Every other row is shifted by half a brick
+        offset = (row % 2) * brick_width // 2
+        for i in range(-1, 3):
+            # Small tone changes so neighboring bricks can be told apart
+            tone = ((row * 3 + i * 5) % 4) * 8
+            color = tuple(max(0, channel - tone) for channel in brick)
+            rect = pygame.Rect(i * brick_width + offset + 1, row * brick_height + 1, brick_width - 2, brick_height - 2)
+            texture.fill(color, rect)
+    return texture
+
+
+class HeightLevels:
+    """Heights from min_height to max_height in HEIGHT_STEP steps"""
+
+    def __init__(self, min_height, max_height):
+        self.min_height = min_height
+        self.count = int(math.log(max_height / min_height) / math.log(HEIGHT_STEP)) + 1
+
+    def level(self, height):
+        """Index of the level closest to height"""
+        if height <= self.min_height:
+            return 0
+        level = round(math.log(height / self.min_height) / math.log(HEIGHT_STEP))
+        return min(level, self.count - 1)
+
+    def height(self, level):
+        return round(self.min_height * HEIGHT_STEP ** level)
+
+
+class WallStrips:
+    """A wall texture pre-sliced into 1px columns at quantized heights
+
+    For each height level (heights grow by HEIGHT_STEP from ``min_height`` to
+    ``max_height``) and wall side, the texture is scaled once to that height,
+    darkened by ``shade(height, side)`` and cut into column subsurfaces.  A
+    textured wall column is then a table lookup plus a blit, never a
+    per-pixel scale.  Levels are built on first use, so only the heights the
+    map actually shows cost memory.
+    """
+
+    def __init__(self, texture, shade, min_height, max_height):
+        self.texture = texture
+        self.size = texture.get_width()
+        self.shade = shade
+        self.heights = HeightLevels(min_height, max_height)
+        self.strips = {}
+        self.view_height = None
+        self.view_placements = None
+
+    def columns(self, level, side):
+        """Column surfaces of the texture at a height level, for one wall side"""
+        key = (level, side)
+        columns = self.strips.get(key)
+        if columns is None:
+            height = self.heights.height(level)
+            scaled = pygame.transform.scale(self.texture, (self.size, height))
+            shade = int(self.shade(height, side))
+            scaled.fill((shade, shade, shade), special_flags=pygame.BLEND_MULT)
+            if pygame.display.get_surface() is not None:
+                scaled = scaled.convert()
+            columns = [scaled.subsurface((x, 0, 1, height)) for x in range(self.size)]
+            self.strips[key] = columns
+        return columns
+
+    def placements(self, view_height):
+        """Per height level, where its strips go on a view view_height pixels tall
+
+        Returns (top, area) pairs: strips are centered on the horizon, and
+        those taller than the view are cropped to the part that shows.
+        """
+        placements = []
+        for level in range(self.heights.count):
+            height = self.heights.height(level)
+            top = (view_height - height) // 2
+            if top < 0:
+                placements.append((0, pygame.Rect(0, -top, 1, view_height)))
+            else:
+                placements.append((top, None))
+        return placements
+
+    def draw(self, surface, heights, sides, texture_x, view_height):
+        """Blit one textured wall column per screen column
+
+        ``heights``, ``sides`` and ``texture_x`` hold the wall height in
+        pixels, the side hit and the texture column for each screen column.
+        """
+        if self.view_height != view_height:
+            self.view_height = view_height
+            self.view_placements = self.placements(view_height)
+        placements = self.view_placements
+        blits = []
+        for x, height in enumerate(heights):
+            level = self.heights.level(height)
+            top, area = placements[level]
+            blits.append((self.columns(level, sides[x])[texture_x[x]], (x, top), area))
+        surface.blits(blits, doreturn=False)
+
+
+def texture_column(pos_x, pos_y, ray_dir_x, ray_dir_y, distance, side, size=TEXTURE_SIZE):
+    """Texture column for where a ray from (pos_x, pos_y) hit a wall"""
+    # Where along the wall face the ray hit (0 to 1)
+    if side == SIDE_X:
+        wall_x = pos_y + ray_dir_y * distance
+    else:
+        wall_x = pos_x + ray_dir_x * distance
+    column = int((wall_x - math.floor(wall_x)) * size)
+    # Mirror faces seen from the other side so textures are not flipped
+    if (side == SIDE_X and ray_dir_x > 0) or (side == SIDE_Y and ray_dir_y < 0):
+        column = size - 1 - column
+    return column
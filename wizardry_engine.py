@@ -0,0 +1,385 @@
+from rng_streams import RngStreams
+from dungeon import DungeonGrid, FLOOR, WALL, STAIRS_DOWN, STAIRS_UP
+from cell_bitset import CellBitset
+from navigation import NavIndex, TOO_FAR
+
+# Game logic for the wizardry-style dungeon.
+# Nothing here touches pygame, so GameState.step() can run without a window
+# and without a frame-rate cap.
+
+# Dungeon map (0=corridor, 1=wall); GameState stores it as a DungeonGrid
+dungeon_map = [
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 0, 1, 0, 0, 1],
+    [1, 0, 1, 1, 1, 0, 1, 0, 0, 1],
+    [1, 0, 0, 0, 1, 0, 0, 0, 0, 1],
+    [1, 0, 1, 0, 1, 1, 1, 1, 0, 1],
+    [1, 0, 1, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 1, 1, 1, 1, 1, 1, 0, 1],
+    [1, 0, 0, 0, 0, 0, 0, 1, 0, 1],
+    [1, 0, 1, 1, 1, 1, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+]
+
+# Enemy definitions
+enemies = [
+    {"name": "Slime", "hp": 20, "attack": 5, "exp": 10, "gold": 5},
+    {"name": "Goblin", "hp": 30, "attack": 8, "exp": 15, "gold": 10},
+    {"name": "Orc", "hp": 50, "attack": 12, "exp": 25, "gold": 15},
+    {"name": "Skeleton", "hp": 40, "attack": 10, "exp": 20, "gold": 12},
+    {"name": "Dark Mage", "hp": 35, "attack": 15, "exp": 30, "gold": 20}
+]
+
+# Spells
+spells = [
+    {"name": "Fireball", "mp_cost": 10, "min_damage": 10, "max_damage": 20, "level_req": 1},
+    {"name": "Ice Spike", "mp_cost": 15, "min_damage": 15, "max_damage": 25, "level_req": 2},
+    {"name": "Lightning", "mp_cost": 20, "min_damage": 20, "max_damage": 35, "level_req": 3}
+]
+
+# Direction definitions
+DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]  # North, East, South, West
+
+ENCOUNTER_RATE = 0.2  # Chance of an enemy encounter per step
+ESCAPE_CHANCE = 0.5  # Chance of running away from a battle
+
+# Combat and leveling rules
+ATTACK_MIN_DAMAGE = 5  # Physical attack roll, plus ATTACK_LEVEL_BONUS per level
+ATTACK_MAX_DAMAGE = 15
+ATTACK_LEVEL_BONUS = 2
+LEVEL_HP_GAIN = 20  # Max HP gained per level up
+LEVEL_MP_GAIN = 10  # Max MP gained per level up
+NEXT_LEVEL_FACTOR = 1.5  # EXP needed for the next level grows by this factor
+
+TICK_RATE = 30  # Ticks (step() calls) per second in the game
+AUTO_WALK_INTERVAL = 6  # Ticks per cell when walking automatically
+
+# Wandering monsters (on top of the random encounters)
+MONSTER_COUNT = 4  # Monsters kept around the player
+MONSTER_MOVE_INTERVAL = 30  # Ticks between monster steps
+MONSTER_SPAWN_RADIUS = 12  # Monsters appear within this many cells of the player...
+MONSTER_MIN_DISTANCE = 3  # ...but not closer than this
+MONSTER_DESPAWN_RADIUS = 24  # Monsters further away than this are dropped
+
+# Actions accepted by GameState.step()
+EXPLORE_ACTIONS = ("forward", "backward", "turn_left", "turn_right", "explore")
+# ("walk_to", x, y) tuples walk to a cell; see GameState.walk_to()
+BATTLE_ACTIONS = ("attack", "run", "spell_1", "spell_2", "spell_3")
+
+
+def new_player():
+    """Player state at the start of the game"""
+    return {
+        "x": 1,
+        "y": 1,
+        "direction": 0,  # 0=North, 1=East, 2=South, 3=West
+        "hp": 100,
+        "max_hp": 100,
+        "mp": 50,
+        "max_mp": 50,
+        "level": 1,
+        "exp": 0,
+        "next_level": 100,
+        "gold": 0
+    }
+
+
+class GameState:
+    """Everything that changes while playing, plus the rules that change it"""
+
+    def __init__(self, dungeon=None, seed=None, encounter_rate=ENCOUNTER_RATE, next_level_factor=NEXT_LEVEL_FACTOR):
+        # dungeon is a DungeonGrid (see dungeon.py for the generators) or a
+        # chunked_dungeon.ChunkedDungeon streamed from disk
+        self.dungeon_map = dungeon if dungeon is not None else DungeonGrid.from_rows(dungeon_map)
+        
+        # One random stream per subsystem, all derived from the seed
+        self.rngs = RngStreams(seed)
+        self.seed = self.rngs.seed
+        self.encounter_rng = self.rngs.get("encounter")
+        self.spawn_rng = self.rngs.get("spawn")
+        self.combat_rng = self.rngs.get("combat")
+        self.enemy_rng = self.rngs.get("enemy")
+        self.escape_rng = self.rngs.get("escape")
+        self.monster_rng = self.rngs.get("monster")
+        self.encounter_rate = encounter_rate
+        self.next_level_factor = next_level_factor
+        self.player = new_player()
+        self.player["x"], self.player["y"] = self.dungeon_map.start
+        # Current enemy (only set during battle)
+        self.current_enemy = None
+        self.battle_mode = False
+        self.message = ""
+        self.ticks = 0
+        # Cells the player has explored, one bitset per floor
+        self.explored = [
+            CellBitset(self.dungeon_map.width, self.dungeon_map.height)
+            for _ in range(self.dungeon_map.floors)
+        ]
+        self.explore()
+        
+        # Wandering monsters on the current floor: {"x", "y", "kind" (index into enemies)}
+        self.monsters = []
+        
+        # Auto-walk: path finding index and the cells still to walk (last one first)
+        self.nav = NavIndex(self.dungeon_map)
+        self.auto_path = []
+        self.auto_wait = 0
+
+    @property
+    def defeated(self):
+        return self.player["hp"] <= 0
+
+    def step(self, actions=()):
+        """Apply a sequence of actions (see EXPLORE_ACTIONS / BATTLE_ACTIONS)"""
+        for action in actions:
+            if isinstance(action, tuple):
+                if action[0] == "walk_to" and not self.battle_mode:
+                    self.walk_to(action[1], action[2])
+            elif self.battle_mode:
+                if action == "attack":
+                    self.player_attack()
+                elif action == "run":
+                    self.run_away()
+                elif action.startswith("spell_"):
+                    self.cast_spell(int(action[6:]) - 1)
+            else:
+                # Manual moves take over from auto-walk
+                self.auto_path = []
+                if action == "forward":
+                    dx, dy = DIRECTIONS[self.player["direction"]]
+                    self.move_player(dx, dy)
+                elif action == "backward":
+                    dx, dy = DIRECTIONS[self.player["direction"]]
+                    self.move_player(-dx, -dy)
+                elif action == "turn_left":
+                    self.rotate_player(-1)
+                elif action == "turn_right":
+                    self.rotate_player(1)
+                elif action == "explore":
+                    self.auto_explore()
+        if self.auto_path and not actions:
+            self.auto_step()
+        # Label the map for path finding a little at a time
+        self.nav.update()
+        if not self.battle_mode:
+            self.update_monsters()
+        self.ticks += 1
+
+    def move_player(self, dx, dy):
+        """Move the player"""
+        new_x = self.player["x"] + dx
+        new_y = self.player["y"] + dy
+        
+        # Walking into a monster fights it instead
+        monster = self.monster_at(new_x, new_y)
+        if monster is not None:
+            self.monsters.remove(monster)
+            self.start_battle(enemies[monster["kind"]])
+            return
+        
+        # Move if destination is not a wall (outside the map counts as wall)
+        cell = self.dungeon_map.get(new_x, new_y)
+        if cell != WALL:
+            self.player["x"] = new_x
+            self.player["y"] = new_y
+            # Load the part of the map the player is heading into
+            self.dungeon_map.prefetch(new_x, new_y, DIRECTIONS[self.player["direction"]])
+            if cell == STAIRS_DOWN or cell == STAIRS_UP:
+                self.take_stairs(cell)
+                self.explore()
+                return
+            self.explore()
+            # Random encounter
+            if self.encounter_rng.random() < self.encounter_rate:
+                self.start_battle()
+
+    def walk_to(self, x, y):
+        """Start walking automatically to cell (x, y)"""
+        path = self.nav.path((self.player["x"], self.player["y"]), (x, y))
+        if path is None:
+            self.message = "You can't find a way there"
+        elif path is TOO_FAR:
+            self.message = "That is too far away to find a way"
+        else:
+            self.auto_path = list(reversed(path))
+            self.auto_wait = 0
+
+    def auto_explore(self):
+        """Start walking automatically to the nearest unexplored cell"""
+        explored = self.explored[self.dungeon_map.floor]
+        path = self.nav.nearest(
+            (self.player["x"], self.player["y"]), lambda x, y: not explored.has(x, y)
+        )
+        if path is None:
+            self.message = "Nothing left to explore nearby"
+        else:
+            self.auto_path = list(reversed(path))
+            self.auto_wait = 0
+
+    def auto_step(self):
+        """Take the next step of the auto-walk path (one cell every AUTO_WALK_INTERVAL ticks)"""
+        if self.auto_wait > 0:
+            self.auto_wait -= 1
+            return
+        self.auto_wait = AUTO_WALK_INTERVAL - 1
+        next_x, next_y = self.auto_path.pop()
+        
+        # Face the next cell, then walk into it
+        step = (next_x - self.player["x"], next_y - self.player["y"])
+        turn = DIRECTIONS.index(step) - self.player["direction"]
+        self.rotate_player((turn + 1) % 4 - 1)
+        self.move_player(*step)
+        # Stop when a battle starts or the stairs took the player elsewhere
+        if self.battle_mode or (self.player["x"], self.player["y"]) != (next_x, next_y):
+            self.auto_path = []
+
+    def explore(self):
+        """Mark the player's cell as explored on the current floor"""
+        self.explored[self.dungeon_map.floor].add(self.player["x"], self.player["y"])
+
+    def take_stairs(self, cell):
+        """Go to the next floor down or up"""
+        if cell == STAIRS_DOWN:
+            self.dungeon_map.set_floor(self.dungeon_map.floor + 1)
+            self.player["x"], self.player["y"] = self.dungeon_map.start
+        else:
+            self.dungeon_map.set_floor(self.dungeon_map.floor - 1)
+            self.player["x"], self.player["y"] = self.dungeon_map.exit
+        self.message = f"You reach floor {self.dungeon_map.floor + 1}"
+        # Monsters stay behind; new ones appear on this floor
+        self.monsters = []
+
+    def monster_at(self, x, y):
+        """The monster standing on cell (x, y), or None"""
+        for monster in self.monsters:
+            if monster["x"] == x and monster["y"] == y:
+                return monster
+        return None
+
+    def update_monsters(self):
+        """Spawn, despawn and move the wandering monsters"""
+        x, y = self.player["x"], self.player["y"]
+        self.monsters = [
+            monster for monster in self.monsters
+            if max(abs(monster["x"] - x), abs(monster["y"] - y)) <= MONSTER_DESPAWN_RADIUS
+        ]
+        if len(self.monsters) < MONSTER_COUNT:
+            self.spawn_monster()
+        if self.ticks % MONSTER_MOVE_INTERVAL:
+            return
+        for monster in self.monsters:
+            dx, dy = self.monster_rng.choice(DIRECTIONS)
+            new_x = monster["x"] + dx
+            new_y = monster["y"] + dy
+            if (new_x, new_y) == (x, y):
+                # The monster found the player
+                self.monsters.remove(monster)
+                self.start_battle(enemies[monster["kind"]])
+                return
+            if self.dungeon_map.get(new_x, new_y) == FLOOR and self.monster_at(new_x, new_y) is None:
+                monster["x"] = new_x
+                monster["y"] = new_y
+
+    def spawn_monster(self):
+        """Try to place one monster on a random floor cell near the player"""
+        rng = self.monster_rng
+        spawn_x = self.player["x"] + rng.randint(-MONSTER_SPAWN_RADIUS, MONSTER_SPAWN_RADIUS)
+        spawn_y = self.player["y"] + rng.randint(-MONSTER_SPAWN_RADIUS, MONSTER_SPAWN_RADIUS)
+        if max(abs(spawn_x - self.player["x"]), abs(spawn_y - self.player["y"])) < MONSTER_MIN_DISTANCE:
+            return
+        if self.dungeon_map.get(spawn_x, spawn_y) != FLOOR or self.monster_at(spawn_x, spawn_y) is not None:
+            return
+        self.monsters.append({"x": spawn_x, "y": spawn_y, "kind": rng.randrange(len(enemies))})
+
+    def rotate_player(self, direction):
+        """Change player direction"""
+        self.player["direction"] = (self.player["direction"] + direction) % 4
+
+    def start_battle(self, enemy_type=None):
+        """Start battle (with a random enemy unless enemy_type is given)"""
+        self.battle_mode = True
+        self.auto_path = []
+        if enemy_type is None:
+            enemy_type = self.spawn_rng.choice(enemies)
+        self.current_enemy = {
+            "name": enemy_type["name"],
+            "hp": enemy_type["hp"],
+            "attack": enemy_type["attack"],
+            "exp": enemy_type["exp"],
+            "gold": enemy_type["gold"]
+        }
+        self.message = f"A {self.current_enemy['name']} appears!"
+
+    def player_attack(self):
+        """Player's physical attack"""
+        damage = self.combat_rng.randint(ATTACK_MIN_DAMAGE, ATTACK_MAX_DAMAGE) + self.player["level"] * ATTACK_LEVEL_BONUS
+        self.current_enemy["hp"] -= damage
+        self.message = f"You attack! {damage} damage to {self.current_enemy['name']}!"
+        
+        if self.current_enemy["hp"] <= 0:
+            self.end_battle()
+        else:
+            # Enemy's attack
+            self.enemy_attack()
+
+    def cast_spell(self, spell_index):
+        """Cast a spell"""
+        if spell_index >= len(spells) or self.player["level"] < spells[spell_index]["level_req"]:
+            self.message = "You can't cast that spell yet!"
+            return
+        
+        spell = spells[spell_index]
+        
+        if self.player["mp"] < spell["mp_cost"]:
+            self.message = "Not enough MP!"
+            return
+        
+        self.player["mp"] -= spell["mp_cost"]
+        damage = self.combat_rng.randint(spell["min_damage"], spell["max_damage"]) + self.player["level"]
+        self.current_enemy["hp"] -= damage
+        self.message = f"You cast {spell['name']}! {damage} damage to {self.current_enemy['name']}!"
+        
+        if self.current_enemy["hp"] <= 0:
+            self.end_battle()
+        else:
+            # Enemy's attack
+            self.enemy_attack()
+
+    def run_away(self):
+        """Try to escape from battle"""
+        if self.escape_rng.random() < ESCAPE_CHANCE:
+            self.battle_mode = False
+            self.message = "You escaped successfully!"
+        else:
+            self.message = "Couldn't escape!"
+            self.enemy_attack()
+
+    def end_battle(self):
+        """End battle with victory"""
+        player = self.player
+        enemy = self.current_enemy
+        player["exp"] += enemy["exp"]
+        player["gold"] += enemy["gold"]
+        self.message = f"You defeated the {enemy['name']}! Gained {enemy['exp']} EXP and {enemy['gold']} gold!"
+        
+        # Level up check
+        if player["exp"] >= player["next_level"]:
+            player["level"] += 1
+            player["max_hp"] += LEVEL_HP_GAIN
+            player["max_mp"] += LEVEL_MP_GAIN
+            player["hp"] = player["max_hp"]
+            player["mp"] = player["max_mp"]
+            player["next_level"] = int(player["next_level"] * self.next_level_factor)
+            self.message += f" Level up! You are now level {player['level']}!"
+        
+        self.battle_mode = False
+        self.current_enemy = None
+
+    def enemy_attack(self):
+        """Enemy's attack"""
+        damage = self.enemy_rng.randint(1, self.current_enemy["attack"])
+        self.player["hp"] -= damage
+        self.message += f"\nThe {self.current_enemy['name']} attacks! {damage} damage to you!"
+        
+        if self.player["hp"] <= 0:
+            self.message += "\nYou have been defeated... Game Over"
@@ -3,6 +3,10 @@ import sys
 import random
 import math
 
+from raycaster import cast_ray, SIDE_Y
+from text_cache import get_font, render_text
+from dungeon import DungeonGrid
+
 # 初期化
 pygame.init()
 
@@ -21,7 +25,7 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 
 # フォント設定
-font = pygame.font.SysFont(None, 36)
+font = get_font(None, 36)
 
 # ダンジョンマップ（0=通路、1=壁）
 dungeon_map = [
@@ -36,6 +40,8 @@ dungeon_map = [
     [1, 0, 1, 1, 1, 1, 0, 0, 0, 1],
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
 ]
+# レイキャスト用の1セル1バイトのマップ
+dungeon_grid = DungeonGrid.from_rows(dungeon_map)
 
 # プレイヤーの状態
 player = {
@@ -67,9 +73,11 @@ DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]  # 北、東、南、西
 # 3D表示用の設定
 FOV = math.pi / 3  # 視野角
 HALF_FOV = FOV / 2
+PLANE_LENGTH = math.tan(HALF_FOV)  # カメラ平面の半分の幅
 NUM_RAYS = 120
 MAX_DEPTH = 8
 WALL_HEIGHT = 100
+SIDE_SHADE = 0.8  # 南北の壁面の明るさ
 
 # ミニマップ設定
 CELL_SIZE = 20
@@ -102,49 +110,43 @@ def draw_minimap():
 
 def cast_rays():
     """3D視点のレイキャスティング"""
-    start_angle = player["direction"] * (math.pi / 2) - HALF_FOV
+    # カメラの向き（プレイヤーの向き）とカメラ平面（右方向）
+    dir_x, dir_y = DIRECTIONS[player["direction"]]
+    plane_x = -dir_y * PLANE_LENGTH
+    plane_y = dir_x * PLANE_LENGTH
+    
+    # レイはプレイヤーのいるマスの中心から飛ばす
+    pos_x = player["x"] + 0.5
+    pos_y = player["y"] + 0.5
     
     for ray in range(NUM_RAYS):
-        angle = start_angle + ray * FOV / NUM_RAYS
+        # カメラ平面上の位置（-1 = 左端、1 = 右端）
+        camera_x = 2 * (ray + 0.5) / NUM_RAYS - 1
         
         # レイの方向ベクトル
-        ray_dir_x = math.cos(angle)
-        ray_dir_y = math.sin(angle)
-        
-        # レイの長さ
-        distance = 0
-        hit_wall = False
+        ray_dir_x = dir_x + plane_x * camera_x
+        ray_dir_y = dir_y + plane_y * camera_x
         
-        while not hit_wall and distance < MAX_DEPTH:
-            distance += 0.1
-            
-            # レイの先端の座標
-            test_x = int(player["x"] + ray_dir_x * distance)
-            test_y = int(player["y"] + ray_dir_y * distance)
-            
-            # マップ範囲外チェック
-            if test_x < 0 or test_x >= len(dungeon_map[0]) or test_y < 0 or test_y >= len(dungeon_map):
-                hit_wall = True
-                distance = MAX_DEPTH
-            # 壁にヒットしたかチェック
-            elif dungeon_map[test_y][test_x] == 1:
-                hit_wall = True
+        # 壁までの垂直距離と当たった面
+        distance, side = cast_ray(dungeon_grid, pos_x, pos_y, ray_dir_x, ray_dir_y, MAX_DEPTH)
         
         # 壁の高さを計算
         ceiling = HEIGHT / 2 - HEIGHT / distance
         floor = HEIGHT - ceiling
         
-        # 距離に応じて壁の色を暗くする
-        wall_color = (
-            min(255, max(0, 255 - distance * 30)),
-            min(255, max(0, 255 - distance * 30)),
-            min(255, max(0, 255 - distance * 30))
-        )
+        # 距離に応じて壁の色を暗くする（南北の面は少し暗く）
+        shade = min(255, max(0, 255 - distance * 30))
+        if side == SIDE_Y:
+            shade *= SIDE_SHADE
+        wall_color = (shade, shade, shade)
+        
+        # このレイが受け持つ列
+        column_x = ray * WIDTH // NUM_RAYS
+        wall_width = (ray + 1) * WIDTH // NUM_RAYS - column_x
         
         # 壁を描画
-        wall_width = WIDTH // NUM_RAYS
         wall_rect = pygame.Rect(
-            ray * wall_width,
+            column_x,
             ceiling,
             wall_width,
             floor - ceiling
@@ -153,7 +155,7 @@ def cast_rays():
         
         # 床を描画
         floor_rect = pygame.Rect(
-            ray * wall_width,
+            column_x,
             floor,
             wall_width,
             HEIGHT - floor
@@ -162,7 +164,7 @@ def cast_rays():
         
         # 天井を描画
         ceiling_rect = pygame.Rect(
-            ray * wall_width,
+            column_x,
             0,
             wall_width,
             ceiling
@@ -243,24 +245,24 @@ def draw_battle_screen():
     screen.fill(BLACK)
     
     # 敵の表示
-    enemy_text = font.render(f"{current_enemy['name']} HP: {current_enemy['hp']}", True, WHITE)
+    enemy_text = render_text(font, f"{current_enemy['name']} HP: {current_enemy['hp']}", WHITE)
     screen.blit(enemy_text, (WIDTH // 2 - enemy_text.get_width() // 2, 100))
     
     # プレイヤーステータス
-    player_text = font.render(f"あなた Lv.{player['level']} HP: {player['hp']}/{player['max_hp']}", True, WHITE)
+    player_text = render_text(font, f"あなた Lv.{player['level']} HP: {player['hp']}/{player['max_hp']}", WHITE)
     screen.blit(player_text, (WIDTH // 2 - player_text.get_width() // 2, HEIGHT - 150))
     
     # メッセージ
     lines = message.split('\n')
     for i, line in enumerate(lines):
-        msg_text = font.render(line, True, WHITE)
+        msg_text = render_text(font, line, WHITE)
         screen.blit(msg_text, (WIDTH // 2 - msg_text.get_width() // 2, 200 + i * 40))
     
     # コマンド
-    attack_text = font.render("Aキー: 攻撃", True, WHITE)
+    attack_text = render_text(font, "Aキー: 攻撃", WHITE)
     screen.blit(attack_text, (50, HEIGHT - 80))
     
-    run_text = font.render("Rキー: 逃げる", True, WHITE)
+    run_text = render_text(font, "Rキー: 逃げる", WHITE)
     screen.blit(run_text, (50, HEIGHT - 40))
 
 def draw_status_bar():
@@ -271,11 +273,11 @@ def draw_status_bar():
     pygame.draw.rect(screen, RED, (20, 20, hp_bar_width, 20))
     pygame.draw.rect(screen, WHITE, (20, 20, 150, 20), 2)
     
-    hp_text = font.render(f"HP: {player['hp']}/{player['max_hp']}", True, WHITE)
+    hp_text = render_text(font, f"HP: {player['hp']}/{player['max_hp']}", WHITE)
     screen.blit(hp_text, (180, 20))
     
     # レベルと経験値
-    level_text = font.render(f"Lv: {player['level']} EXP: {player['exp']}/{player['next_level']}", True, WHITE)
+    level_text = render_text(font, f"Lv: {player['level']} EXP: {player['exp']}/{player['next_level']}", WHITE)
     screen.blit(level_text, (20, 50))
 
 # ゲームループ
@@ -328,7 +330,7 @@ while running:
         
         # メッセージがあれば表示
         if message:
-            msg_text = font.render(message, True, WHITE)
+            msg_text = render_text(font, message, WHITE)
             screen.blit(msg_text, (WIDTH // 2 - msg_text.get_width() // 2, HEIGHT - 50))
     
     pygame.display.flip()
@@ -1,7 +1,41 @@
+import argparse
+import os
 import pygame
-import sys
 import random
+import sys
 import math
+import time
+
+from raycaster import SIDE_X
+from raycast_view import RaycastView
+from view_cache import ViewCache
+from dirty_rects import RegionTracker
+from minimap import MinimapLayer
+from billboards import Billboards, make_monster_sprite
+from text_cache import get_font, render_text
+from dungeon import DungeonGrid, generate_rooms, generate_maze
+from chunked_dungeon import ChunkedDungeon
+from wizardry_engine import GameState, DIRECTIONS, EXPLORE_ACTIONS, BATTLE_ACTIONS, TICK_RATE, spells, enemies
+from fixed_timestep import FixedTimestep
+from replay import ReplayRecorder
+from savegame import FILE_VERSION, write_save, load_game, save_version, Autosaver
+from frame_profiler import profiler
+from quality_governor import QualityGovernor
+
+# Command line options
+parser = argparse.ArgumentParser(description="Wizardry-style dungeon crawler")
+parser.add_argument("--seed", type=int, help="seed for a reproducible game")
+parser.add_argument("--record", metavar="PATH", help="record the input to a replay file")
+parser.add_argument("--dungeon", choices=["classic", "rooms", "maze"], default="classic",
+                    help="hand-made map or a generated one")
+parser.add_argument("--load", metavar="PATH", help="play a chunked dungeon file (see chunked_dungeon.py)")
+parser.add_argument("--save", metavar="PATH", help="continue the game saved in PATH and autosave to it")
+parser.add_argument("--size", type=int, default=64, help="width and height of a generated dungeon")
+parser.add_argument("--profile", metavar="PATH",
+                    help="start with the frame profiler on and write its timings to PATH (.csv or .json trace)")
+parser.add_argument("--fps", type=int, default=TICK_RATE,
+                    help=f"draw at most FPS frames per second, 0 for no limit (the game always runs at {TICK_RATE} ticks per second)")
+args = parser.parse_args()
 
 # Initialize pygame
 pygame.init()
@@ -22,269 +56,207 @@ GREEN = (0, 255, 0)
 GOLD = (255, 215, 0)
 
 # Font settings
-font = pygame.font.SysFont(None, 36)
-small_font = pygame.font.SysFont(None, 24)
-
-# Dungeon map (0=corridor, 1=wall)
-dungeon_map = [
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-    [1, 0, 0, 0, 0, 0, 1, 0, 0, 1],
-    [1, 0, 1, 1, 1, 0, 1, 0, 0, 1],
-    [1, 0, 0, 0, 1, 0, 0, 0, 0, 1],
-    [1, 0, 1, 0, 1, 1, 1, 1, 0, 1],
-    [1, 0, 1, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 1, 1, 1, 1, 1, 1, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 1, 0, 1],
-    [1, 0, 1, 1, 1, 1, 0, 0, 0, 1],
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
-]
-
-# Player state
-player = {
-    "x": 1,
-    "y": 1,
-    "direction": 0,  # 0=North, 1=East, 2=South, 3=West
-    "hp": 100,
-    "max_hp": 100,
-    "mp": 50,
-    "max_mp": 50,
-    "level": 1,
-    "exp": 0,
-    "next_level": 100,
-    "gold": 0
-}
+font = get_font(None, 36)
+small_font = get_font(None, 24)
+
+# Game state (the rules live in wizardry_engine)
+# A generated dungeon is built from the game seed, so replays rebuild the same map
+seed = args.seed if args.seed is not None else random.randrange(2 ** 31)
+if args.save and os.path.exists(args.save):
+    # Replays start from a new game, which a continued game is not
+    if args.record:
+        parser.error("--record cannot be used when continuing a saved game")
+    state = load_game(args.save)
+elif args.load:
+    state = GameState(ChunkedDungeon(args.load), seed=seed)
+    game_name = f"wizardry:file:{args.load}"
+elif args.dungeon == "classic":
+    state = GameState(seed=seed)
+    game_name = "wizardry"
+else:
+    generate = generate_rooms if args.dungeon == "rooms" else generate_maze
+    state = GameState(generate(args.size, args.size, seed), seed=seed)
+    game_name = f"wizardry:{args.dungeon}:{args.size}"
 
-# Enemy definitions
-enemies = [
-    {"name": "Slime", "hp": 20, "attack": 5, "exp": 10, "gold": 5},
-    {"name": "Goblin", "hp": 30, "attack": 8, "exp": 15, "gold": 10},
-    {"name": "Orc", "hp": 50, "attack": 12, "exp": 25, "gold": 15},
-    {"name": "Skeleton", "hp": 40, "attack": 10, "exp": 20, "gold": 12},
-    {"name": "Dark Mage", "hp": 35, "attack": 15, "exp": 30, "gold": 20}
-]
-
-# Spells
-spells = [
-    {"name": "Fireball", "mp_cost": 10, "min_damage": 10, "max_damage": 20, "level_req": 1},
-    {"name": "Ice Spike", "mp_cost": 15, "min_damage": 15, "max_damage": 25, "level_req": 2},
-    {"name": "Lightning", "mp_cost": 20, "min_damage": 20, "max_damage": 35, "level_req": 3}
-]
-
-# Current enemy (only set during battle)
-current_enemy = None
-battle_mode = False
-message = ""
-
-# Direction definitions
-DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]  # North, East, South, West
+# Save file, rewritten in place after every tick
+if args.save:
+    # New games, and saves in an older format, are written in full first
+    if not os.path.exists(args.save) or save_version(args.save) != FILE_VERSION:
+        write_save(args.save, state)
+    autosaver = Autosaver(args.save)
+else:
+    autosaver = None
+
+# Input recorder for exact replays (see replay.py)
+recorder = ReplayRecorder(
+    args.record, game_name, state.seed, EXPLORE_ACTIONS + BATTLE_ACTIONS + ("walk_to",)
+) if args.record else None
 
 # 3D display settings
 FOV = math.pi / 3  # Field of view
 HALF_FOV = FOV / 2
-NUM_RAYS = 120
+PLANE_LENGTH = math.tan(HALF_FOV)  # Half width of the camera plane
+TEXTURED_WALLS = True  # Brick textured walls instead of flat shaded ones
+NUM_RAYS = WIDTH if TEXTURED_WALLS else 120  # Textures need one ray per screen column
 MAX_DEPTH = 8
 WALL_HEIGHT = 100
+SIDE_SHADE = 0.8  # Brightness of north/south wall faces
+VECTORIZED_RAYS = True  # Cast all rays at once with NumPy when it is installed
+
+# Renders the 3D view (see raycast_view.py)
+raycast_view = RaycastView(
+    WIDTH, HEIGHT, NUM_RAYS, MAX_DEPTH, PLANE_LENGTH, TEXTURED_WALLS, VECTORIZED_RAYS, SIDE_SHADE, GRAY, DARK_GRAY
+)
+
+# Adaptive view quality: fewer rays or a lower resolution when rendering a
+# view takes longer than VIEW_BUDGET, better again when there is time to spare
+ADAPTIVE_QUALITY = True
+VIEW_BUDGET = 0.5 / TICK_RATE  # Seconds a view may take to render (half a tick)
+# (rays, resolution divisor), best first, from benchmarks/run_benchmarks.py
+# (cast_rays/rooms256, best ms per view)
+if TEXTURED_WALLS or raycast_view.batched:
+    # Casting all rays at once costs about the same for any ray count (60 to
+    # 800 rays: ~5 ms), so only a lower resolution is cheaper (/2: ~1.9 ms,
+    # /4: ~1.0 ms); textures need one ray per column anyway
+    QUALITY_LEVELS = [(WIDTH, 1), (WIDTH // 2, 2), (WIDTH // 4, 4)]
+else:
+    # One ray at a time costs about the same at any resolution, so only fewer
+    # rays are cheaper (800: ~3.2 ms, 400: ~1.8, 200: ~1.1, 120: ~0.7, 60: ~0.4)
+    QUALITY_LEVELS = [(WIDTH, 1), (WIDTH // 2, 1), (WIDTH // 4, 1), (NUM_RAYS, 1), (NUM_RAYS // 2, 1)]
+START_LEVEL = QUALITY_LEVELS.index((NUM_RAYS, 1)) if (NUM_RAYS, 1) in QUALITY_LEVELS else 0
+governor = QualityGovernor(QUALITY_LEVELS, VIEW_BUDGET, START_LEVEL)
+if ADAPTIVE_QUALITY:
+    raycast_view.set_quality(*governor.quality)
+
+# Wandering monsters, drawn as sprites standing in their cells
+MONSTER_SCALE = 0.7  # Monster height relative to the walls
+MONSTER_COLORS = [(60, 200, 60), (150, 110, 50), (90, 130, 70), (220, 220, 200), (130, 60, 170)]  # Per enemy type
+monster_sprites = Billboards(
+    [make_monster_sprite(color) for color in MONSTER_COLORS[:len(enemies)]],
+    lambda height: raycast_view.shade(height, SIDE_X),
+    MONSTER_SCALE * 2 * HEIGHT / MAX_DEPTH, MONSTER_SCALE * 4 * HEIGHT, MONSTER_SCALE
+)
+
+# View cache settings
+VIEW_CACHE = True  # Reuse rendered views while the player stands still
+VIEW_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory cap for cached views
+PRERENDER_VIEWS = False  # Render every view of the map at load time
+
+# Only redraw and present screen regions that changed
+DIRTY_RECTS = False
 
 # Minimap settings
 CELL_SIZE = 20
 MAP_OFFSET_X = 600
 MAP_OFFSET_Y = 400
+MINIMAP_CELLS = 10  # Cells shown across the minimap; larger maps scroll
+FOG_OF_WAR = True  # Only show cells the player has seen on the minimap
+
+# Pre-rendered minimap (corridor cells white, walls black, stairs down blue, stairs up green,
+# unexplored cells dark gray)
+minimap = MinimapLayer(
+    state.dungeon_map, CELL_SIZE, MINIMAP_CELLS, [WHITE, BLACK, BLUE, GREEN],
+    state.explored[state.dungeon_map.floor] if FOG_OF_WAR else None, DARK_GRAY
+)
+revealed_view = None  # View whose cells were last added to the auto-map
 
 def draw_minimap():
     """Draw the minimap"""
-    for y in range(len(dungeon_map)):
-        for x in range(len(dungeon_map[y])):
-            rect = pygame.Rect(
-                MAP_OFFSET_X + x * CELL_SIZE,
-                MAP_OFFSET_Y + y * CELL_SIZE,
-                CELL_SIZE - 1,
-                CELL_SIZE - 1
-            )
-            color = BLACK if dungeon_map[y][x] == 1 else WHITE
-            pygame.draw.rect(screen, color, rect)
-    
-    # Show player position
-    player_x = MAP_OFFSET_X + player["x"] * CELL_SIZE + CELL_SIZE // 2
-    player_y = MAP_OFFSET_Y + player["y"] * CELL_SIZE + CELL_SIZE // 2
-    pygame.draw.circle(screen, RED, (player_x, player_y), 5)
-    
-    # Show player direction
-    dx, dy = DIRECTIONS[player["direction"]]
-    end_x = player_x + dx * 10
-    end_y = player_y + dy * 10
-    pygame.draw.line(screen, GREEN, (player_x, player_y), (end_x, end_y), 2)
-
-def cast_rays():
-    """3D perspective ray casting"""
-    start_angle = player["direction"] * (math.pi / 2) - HALF_FOV
-    
-    for ray in range(NUM_RAYS):
-        angle = start_angle + ray * FOV / NUM_RAYS
-        
-        # Ray direction vector
-        ray_dir_x = math.cos(angle)
-        ray_dir_y = math.sin(angle)
-        
-        # Ray length
-        distance = 0
-        hit_wall = False
-        
-        while not hit_wall and distance < MAX_DEPTH:
-            distance += 0.1
-            
-            # Ray endpoint coordinates
-            test_x = int(player["x"] + ray_dir_x * distance)
-            test_y = int(player["y"] + ray_dir_y * distance)
-            
-            # Check if out of map range
-            if test_x < 0 or test_x >= len(dungeon_map[0]) or test_y < 0 or test_y >= len(dungeon_map):
-                hit_wall = True
-                distance = MAX_DEPTH
-            # Check if hit wall
-            elif dungeon_map[test_y][test_x] == 1:
-                hit_wall = True
-        
-        # Calculate wall height
-        ceiling = HEIGHT / 2 - HEIGHT / distance
-        floor = HEIGHT - ceiling
-        
-        # Darken wall color based on distance
-        wall_color = (
-            min(255, max(0, 255 - distance * 30)),
-            min(255, max(0, 255 - distance * 30)),
-            min(255, max(0, 255 - distance * 30))
-        )
-        
-        # Draw wall
-        wall_width = WIDTH // NUM_RAYS
-        wall_rect = pygame.Rect(
-            ray * wall_width,
-            ceiling,
-            wall_width,
-            floor - ceiling
-        )
-        pygame.draw.rect(screen, wall_color, wall_rect)
-        
-        # Draw floor
-        floor_rect = pygame.Rect(
-            ray * wall_width,
-            floor,
-            wall_width,
-            HEIGHT - floor
-        )
-        pygame.draw.rect(screen, DARK_GRAY, floor_rect)
-        
-        # Draw ceiling
-        ceiling_rect = pygame.Rect(
-            ray * wall_width,
-            0,
-            wall_width,
-            ceiling
-        )
-        pygame.draw.rect(screen, GRAY, ceiling_rect)
-
-def move_player(dx, dy):
-    """Move the player"""
-    new_x = player["x"] + dx
-    new_y = player["y"] + dy
-    
-    # Move if destination is not a wall
-    if 0 <= new_x < len(dungeon_map[0]) and 0 <= new_y < len(dungeon_map):
-        if dungeon_map[new_y][new_x] == 0:
-            player["x"] = new_x
-            player["y"] = new_y
-            # Random encounter
-            if random.random() < 0.2:  # 20% chance to encounter enemy
-                start_battle()
-
-def rotate_player(direction):
-    """Change player direction"""
-    player["direction"] = (player["direction"] + direction) % 4
-
-def start_battle():
-    """Start battle"""
-    global battle_mode, current_enemy, message
-    battle_mode = True
-    enemy_type = random.choice(enemies)
-    current_enemy = {
-        "name": enemy_type["name"],
-        "hp": enemy_type["hp"],
-        "attack": enemy_type["attack"],
-        "exp": enemy_type["exp"],
-        "gold": enemy_type["gold"]
-    }
-    message = f"A {current_enemy['name']} appears!"
-
-def player_attack():
-    """Player's physical attack"""
-    global battle_mode, current_enemy, message
-    
-    damage = random.randint(5, 15) + player["level"] * 2
-    current_enemy["hp"] -= damage
-    message = f"You attack! {damage} damage to {current_enemy['name']}!"
-    
-    if current_enemy["hp"] <= 0:
-        end_battle()
-    else:
-        # Enemy's attack
-        enemy_attack()
+    minimap.draw(
+        screen,
+        (MAP_OFFSET_X, MAP_OFFSET_Y),
+        state.player["x"],
+        state.player["y"],
+        DIRECTIONS[state.player["direction"]],
+        RED,
+        GREEN
+    )
 
-def cast_spell(spell_index):
-    """Cast a spell"""
-    global battle_mode, current_enemy, message
-    
-    if spell_index >= len(spells) or player["level"] < spells[spell_index]["level_req"]:
-        message = "You can't cast that spell yet!"
-        return
-    
-    spell = spells[spell_index]
-    
-    if player["mp"] < spell["mp_cost"]:
-        message = "Not enough MP!"
-        return
-    
-    player["mp"] -= spell["mp_cost"]
-    damage = random.randint(spell["min_damage"], spell["max_damage"]) + player["level"]
-    current_enemy["hp"] -= damage
-    message = f"You cast {spell['name']}! {damage} damage to {current_enemy['name']}!"
-    
-    if current_enemy["hp"] <= 0:
-        end_battle()
-    else:
-        # Enemy's attack
-        enemy_attack()
+def minimap_cell(pos):
+    """Map cell under screen position pos on the minimap, or None"""
+    column = (pos[0] - MAP_OFFSET_X) // CELL_SIZE
+    row = (pos[1] - MAP_OFFSET_Y) // CELL_SIZE
+    if not (0 <= column < MINIMAP_CELLS and 0 <= row < MINIMAP_CELLS):
+        return None
+    origin_x, origin_y = minimap.view_origin(state.player["x"], state.player["y"])
+    return origin_x + column, origin_y + row
 
-def end_battle():
-    """End battle with victory"""
-    global battle_mode, current_enemy, message
-    
-    player["exp"] += current_enemy["exp"]
-    player["gold"] += current_enemy["gold"]
-    message = f"You defeated the {current_enemy['name']}! Gained {current_enemy['exp']} EXP and {current_enemy['gold']} gold!"
-    
-    # Level up check
-    if player["exp"] >= player["next_level"]:
-        player["level"] += 1
-        player["max_hp"] += 20
-        player["max_mp"] += 10
-        player["hp"] = player["max_hp"]
-        player["mp"] = player["max_mp"]
-        player["next_level"] = int(player["next_level"] * 1.5)
-        message += f" Level up! You are now level {player['level']}!"
-    
-    battle_mode = False
-    current_enemy = None
+def cast_rays(surface, x, y, direction):
+    """3D perspective ray casting of the view from cell (x, y) facing direction
 
-def enemy_attack():
-    """Enemy's attack"""
-    global message
+    Returns the cells the rays passed through or hit, for the auto-map, and
+    the wall distance for every screen column, for drawing sprites.
+    """
+    return raycast_view.render(surface, state.dungeon_map, x, y, DIRECTIONS[direction])
+
+def render_view(surface, view):
+    """Render the 3D view for a view cache key (x, y, direction)
+
+    Returns (visible cells, depth, quality level the view was rendered at).
+    """
+    level = governor.level
+    with profiler.section("cast_rays"):
+        start = time.perf_counter()
+        cells, depth = cast_rays(surface, *view)
+    # Switch the quality for the next views if this one was too slow (or fast)
+    if ADAPTIVE_QUALITY and governor.record(time.perf_counter() - start):
+        raycast_view.set_quality(*governor.quality)
+    return cells, depth, level
+
+# Rendered 3D views, one per (x, y, direction) the player has stood at
+view_cache = ViewCache((WIDTH, HEIGHT), render_view, VIEW_CACHE_MAX_BYTES)
+if PRERENDER_VIEWS and isinstance(state.dungeon_map, DungeonGrid):  # Maps held in memory only
+    view_cache.prefill(
+        (x, y, direction)
+        for x, y in state.dungeon_map.floor_cells()
+        for direction in range(len(DIRECTIONS))
+    )
+
+def draw_view():
+    """Draw the 3D view from the player's position, using the view cache"""
+    global revealed_view
+    view_key = (state.player["x"], state.player["y"], state.player["direction"])
+    if VIEW_CACHE:
+        # Views rendered at a lower quality than the current one are rendered again
+        info = view_cache.info(view_key)
+        if info is not None and info[2] > governor.level:
+            view_cache.discard(view_key)
+        view = view_cache.get(view_key)
+        screen.blit(view, (0, 0))
+        cells, depth, _ = view_cache.info(view_key)
+    else:
+        cells, depth, _ = render_view(screen, view_key)
     
-    damage = random.randint(1, current_enemy["attack"])
-    player["hp"] -= damage
-    message += f"\nThe {current_enemy['name']} attacks! {damage} damage to you!"
+    with profiler.section("draw_monsters"):
+        draw_monsters(depth)
     
-    if player["hp"] <= 0:
-        message += "\nYou have been defeated... Game Over"
+    # Add what the player sees to the auto-map (the cells come from the raycast)
+    if FOG_OF_WAR and view_key != revealed_view:
+        revealed_view = view_key
+        reveal_cells(cells)
+
+def draw_monsters(depth):
+    """Draw the wandering monsters over the 3D view, behind walls that are nearer"""
+    if not state.monsters:
+        return
+    dir_x, dir_y = DIRECTIONS[state.player["direction"]]
+    camera = (
+        state.player["x"] + 0.5, state.player["y"] + 0.5,
+        dir_x, dir_y, -dir_y * PLANE_LENGTH, dir_x * PLANE_LENGTH
+    )
+    sprites = [(monster["x"] + 0.5, monster["y"] + 0.5, monster["kind"]) for monster in state.monsters]
+    monster_sprites.draw(screen, sprites, camera, depth, HEIGHT)
+
+def reveal_cells(cells):
+    """Mark cells as explored and uncover the new ones on the minimap"""
+    grid = state.dungeon_map
+    explored = state.explored[grid.floor]
+    new_cells = [
+        (x, y) for x, y in cells
+        if 0 <= x < grid.width and 0 <= y < grid.height and explored.add(x, y)
+    ]
+    if new_cells:
+        minimap.reveal(new_cells)
 
 def draw_battle_screen():
     """Draw battle screen"""
@@ -292,141 +264,227 @@ def draw_battle_screen():
     screen.fill(BLACK)
     
     # Enemy display
-    enemy_text = font.render(f"{current_enemy['name']} HP: {current_enemy['hp']}", True, WHITE)
+    enemy_text = render_text(font, f"{state.current_enemy['name']} HP: {state.current_enemy['hp']}", WHITE)
     screen.blit(enemy_text, (WIDTH // 2 - enemy_text.get_width() // 2, 100))
     
     # Player status
-    player_text = font.render(f"You Lv.{player['level']} HP: {player['hp']}/{player['max_hp']} MP: {player['mp']}/{player['max_mp']}", True, WHITE)
+    player_text = render_text(font, f"You Lv.{state.player['level']} HP: {state.player['hp']}/{state.player['max_hp']} MP: {state.player['mp']}/{state.player['max_mp']}", WHITE)
     screen.blit(player_text, (WIDTH // 2 - player_text.get_width() // 2, HEIGHT - 150))
     
     # Message
-    lines = message.split('\n')
+    lines = state.message.split('\n')
     for i, line in enumerate(lines):
-        msg_text = font.render(line, True, WHITE)
+        msg_text = render_text(font, line, WHITE)
         screen.blit(msg_text, (WIDTH // 2 - msg_text.get_width() // 2, 200 + i * 40))
     
     # Commands
-    attack_text = font.render("A: Attack", True, WHITE)
+    attack_text = render_text(font, "A: Attack", WHITE)
     screen.blit(attack_text, (50, HEIGHT - 120))
     
-    run_text = font.render("R: Run", True, WHITE)
+    run_text = render_text(font, "R: Run", WHITE)
     screen.blit(run_text, (50, HEIGHT - 80))
     
     # Spell commands
     for i, spell in enumerate(spells):
-        if player["level"] >= spell["level_req"]:
+        if state.player["level"] >= spell["level_req"]:
             spell_key = str(i + 1)
-            spell_text = font.render(f"{spell_key}: {spell['name']} ({spell['mp_cost']} MP)", True, WHITE)
+            spell_text = render_text(font, f"{spell_key}: {spell['name']} ({spell['mp_cost']} MP)", WHITE)
             screen.blit(spell_text, (250, HEIGHT - 120 + i * 40))
 
 def draw_status_bar():
     """Draw status bar"""
     # HP bar
-    hp_percent = player["hp"] / player["max_hp"]
+    hp_percent = state.player["hp"] / state.player["max_hp"]
     hp_bar_width = 150 * hp_percent
     pygame.draw.rect(screen, RED, (20, 20, hp_bar_width, 20))
     pygame.draw.rect(screen, WHITE, (20, 20, 150, 20), 2)
     
-    hp_text = font.render(f"HP: {player['hp']}/{player['max_hp']}", True, WHITE)
+    hp_text = render_text(font, f"HP: {state.player['hp']}/{state.player['max_hp']}", WHITE)
     screen.blit(hp_text, (180, 20))
     
     # MP bar
-    mp_percent = player["mp"] / player["max_mp"]
+    mp_percent = state.player["mp"] / state.player["max_mp"]
     mp_bar_width = 150 * mp_percent
     pygame.draw.rect(screen, BLUE, (20, 50, mp_bar_width, 20))
     pygame.draw.rect(screen, WHITE, (20, 50, 150, 20), 2)
     
-    mp_text = font.render(f"MP: {player['mp']}/{player['max_mp']}", True, WHITE)
+    mp_text = render_text(font, f"MP: {state.player['mp']}/{state.player['max_mp']}", WHITE)
     screen.blit(mp_text, (180, 50))
     
     # Level and experience
-    level_text = font.render(f"Lv: {player['level']} EXP: {player['exp']}/{player['next_level']}", True, WHITE)
+    level_text = render_text(font, f"Lv: {state.player['level']} EXP: {state.player['exp']}/{state.player['next_level']}", WHITE)
     screen.blit(level_text, (20, 80))
     
     # Gold
-    gold_text = font.render(f"Gold: {player['gold']}", True, GOLD)
+    gold_text = render_text(font, f"Gold: {state.player['gold']}", GOLD)
     screen.blit(gold_text, (20, 110))
 
+def draw_frame():
+    """Draw the whole frame for the current mode"""
+    screen.fill(BLACK)
+    
+    if state.battle_mode:
+        draw_battle_screen()
+    else:
+        # Draw 3D perspective
+        draw_view()
+        
+        # Draw minimap
+        with profiler.section("draw_minimap"):
+            draw_minimap()
+        
+        # Draw status bar
+        with profiler.section("draw_status_bar"):
+            draw_status_bar()
+        
+        # Draw controls help
+        draw_controls_help()
+        
+        # Show message if any
+        if state.message:
+            msg_text = render_text(font, state.message, WHITE)
+            screen.blit(msg_text, (WIDTH // 2 - msg_text.get_width() // 2, HEIGHT - 50))
+
+def draw_profiler():
+    """Draw the frame timings (F3) on top of the frame; returns the rect they cover"""
+    return profiler.draw(screen, (WIDTH - 10, 10))
+
+def check_dirty_regions():
+    """Mark the screen regions whose content changed since the last frame"""
+    # The 3D view (or battle background) covers the whole screen
+    view = (
+        state.battle_mode, state.dungeon_map.floor, state.player["x"], state.player["y"], state.player["direction"],
+        tuple((monster["x"], monster["y"]) for monster in state.monsters)
+    )
+    dirty_regions.check("view", view, screen.get_rect())
+    
+    stats = (
+        state.player["hp"], state.player["max_hp"], state.player["mp"], state.player["max_mp"],
+        state.player["level"], state.player["exp"], state.player["next_level"], state.player["gold"]
+    )
+    if state.battle_mode:
+        dirty_regions.check("enemy", (state.current_enemy["name"], state.current_enemy["hp"]), (0, 90, WIDTH, 45))
+        dirty_regions.check("battle_status", stats, (0, HEIGHT - 160, WIDTH, 45))
+        dirty_regions.check("battle_message", state.message, (0, 190, WIDTH, HEIGHT - 350))
+    else:
+        dirty_regions.check("status", stats, (0, 0, WIDTH // 2, 140))
+        dirty_regions.check("message", state.message, (0, HEIGHT - 60, WIDTH, 60))
+
 def draw_controls_help():
     """Draw controls help"""
-    if not battle_mode:
+    if not state.battle_mode:
         controls = [
             "Controls:",
-            "Arrow keys: Move/Turn",
+            "Arrow keys: Move/Turn  E: Explore  Click map: Walk",
             "A: Attack (in battle)",
             "R: Run (in battle)",
             "1-3: Cast spells (in battle)"
         ]
         
         for i, line in enumerate(controls):
-            help_text = small_font.render(line, True, WHITE)
+            help_text = render_text(small_font, line, WHITE)
             screen.blit(help_text, (20, HEIGHT - 150 + i * 25))
 
+# Keys and the game actions they trigger
+KEY_ACTIONS = {
+    pygame.K_UP: "forward",  # Move forward
+    pygame.K_DOWN: "backward",  # Move backward
+    pygame.K_LEFT: "turn_left",  # Turn left
+    pygame.K_RIGHT: "turn_right",  # Turn right
+    pygame.K_e: "explore",  # Walk to the nearest unexplored cell
+    pygame.K_a: "attack",  # Attack (in battle)
+    pygame.K_r: "run",  # Run (in battle)
+    pygame.K_1: "spell_1",  # Cast first spell (in battle)
+    pygame.K_2: "spell_2",  # Cast second spell (in battle)
+    pygame.K_3: "spell_3"  # Cast third spell (in battle)
+}
+PROFILER_KEY = pygame.K_F3  # Show / hide the frame profiler
+
 # Game loop
+# The game advances in ticks of a fixed length (1 / TICK_RATE seconds) and
+# frames are drawn in between, at most --fps a second; when drawing falls
+# behind, several ticks run before the next frame
 clock = pygame.time.Clock()
+timestep = FixedTimestep(TICK_RATE)
+pending = []  # Actions for the next tick
 running = True
+dirty_regions = RegionTracker()
+shown_floor = state.dungeon_map.floor
+if args.profile:
+    profiler.toggle()
 
 while running:
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        
-        if event.type == pygame.KEYDOWN:
-            if battle_mode:
-                if event.key == pygame.K_a:  # Attack
-                    player_attack()
-                elif event.key == pygame.K_r:  # Run
-                    if random.random() < 0.5:  # 50% chance to escape
-                        battle_mode = False
-                        message = "You escaped successfully!"
-                    else:
-                        message = "Couldn't escape!"
-                        enemy_attack()
-                elif event.key == pygame.K_1:  # Cast first spell
-                    cast_spell(0)
-                elif event.key == pygame.K_2:  # Cast second spell
-                    cast_spell(1)
-                elif event.key == pygame.K_3:  # Cast third spell
-                    cast_spell(2)
-            else:
-                if event.key == pygame.K_UP:  # Move forward
-                    dx, dy = DIRECTIONS[player["direction"]]
-                    move_player(dx, dy)
-                elif event.key == pygame.K_DOWN:  # Move backward
-                    dx, dy = DIRECTIONS[player["direction"]]
-                    move_player(-dx, -dy)
-                elif event.key == pygame.K_LEFT:  # Turn left
-                    rotate_player(-1)
-                elif event.key == pygame.K_RIGHT:  # Turn right
-                    rotate_player(1)
+    profiler.begin_frame()
     
-    # Drawing
-    screen.fill(BLACK)
+    # Event handling (keys are turned into game actions)
+    with profiler.section("events"):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            
+            # The window contents were lost, redraw everything
+            if event.type == pygame.VIDEOEXPOSE:
+                dirty_regions.invalidate()
+            
+            if event.type == pygame.KEYDOWN and event.key in KEY_ACTIONS:
+                pending.append(KEY_ACTIONS[event.key])
+            
+            # Show / hide the profiler overlay (dirty_regions redraws what it covered)
+            if event.type == pygame.KEYDOWN and event.key == PROFILER_KEY:
+                profiler.toggle()
+            
+            # Clicking a minimap cell walks there
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not state.battle_mode:
+                cell = minimap_cell(event.pos)
+                if cell is not None:
+                    pending.append(("walk_to", *cell))
     
-    if battle_mode:
-        draw_battle_screen()
-    else:
-        # Draw 3D perspective
-        cast_rays()
-        
-        # Draw minimap
-        draw_minimap()
-        
-        # Draw status bar
-        draw_status_bar()
-        
-        # Draw controls help
-        draw_controls_help()
-        
-        # Show message if any
-        if message:
-            msg_text = font.render(message, True, WHITE)
-            screen.blit(msg_text, (WIDTH // 2 - msg_text.get_width() // 2, HEIGHT - 50))
+    # Update game state, one tick at a time for the time that passed
+    ticks = timestep.advance()
+    for _ in range(ticks):
+        actions = pending
+        pending = []
+        with profiler.section("step"):
+            state.step(actions)
+        if recorder:
+            recorder.record(actions)
+    # Every tick changes the game, with or without input (auto-walk,
+    # wandering monsters, the tick count), so save after each one
+    if autosaver and ticks:
+        with profiler.section("autosave"):
+            autosaver.save(state)
+    # Cached views and the minimap belong to the floor they were drawn on
+    if state.dungeon_map.floor != shown_floor:
+        shown_floor = state.dungeon_map.floor
+        view_cache.clear()
+        if FOG_OF_WAR:
+            minimap.explored = state.explored[shown_floor]
+            revealed_view = None
+        minimap.invalidate()
     
-    pygame.display.flip()
-    clock.tick(30)
+    # Drawing (in dirty-rect mode only when something changed)
+    if DIRTY_RECTS:
+        check_dirty_regions()
+        # The profiler overlay changes every frame and may change size
+        dirty_regions.draw(screen, draw_frame, draw_profiler if profiler.enabled else None)
+        with profiler.section("display.flip"):
+            dirty_regions.present()
+    else:
+        draw_frame()
+        if profiler.enabled:
+            draw_profiler()
+        with profiler.section("display.flip"):
+            pygame.display.flip()
+    profiler.end_frame()
+    clock.tick(args.fps)
 
 # End game
+if args.profile:
+    profiler.write(args.profile)
+if recorder:
+    recorder.close()
+if autosaver:
+    autosaver.save(state)
+    autosaver.close()
 pygame.quit()
 sys.exit()
\ No newline at end of file